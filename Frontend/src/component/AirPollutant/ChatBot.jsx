@@ -7,6 +7,7 @@ const Chatbot = () => {
   const [userInput, setUserInput] = useState('');
   const [isBotTyping, setIsBotTyping] = useState(false);
   const [isAuthenticated, setIsAuthenticated] = useState(false);
+  const [conversationId, setConversationId] = useState(null);
   const messageBoxRef = useRef(null);
   const navigate = useNavigate();
 
@@ -48,13 +49,13 @@ const Chatbot = () => {
     setIsBotTyping(true);
 
     try {
-      const response = await fetch('http://localhost:5000/api/chatbot', {
+      const response = await fetch('http://localhost:5000/api/chatbot/stream', {
         method: 'POST',
         headers: { 
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${localStorage.getItem("authToken")}`
         },
-        body: JSON.stringify({ message: userInput }),
+        body: JSON.stringify({ message: userInput, conversation_id: conversationId }),
         credentials: 'include',
       });
 
@@ -66,12 +67,47 @@ const Chatbot = () => {
         throw new Error('Failed to send message');
       }
 
-      const data = await response.json();
-      if (data.error) {
-        throw new Error(data.error);
+      // Read Server-Sent Events: 'token' events while the answer is generated,
+      // then 'done' with the formatted response (or 'error')
+      const updateBotMessage = (update) => {
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          if (last && last.type === 'bot' && last.streaming) {
+            return [...prev.slice(0, -1), update(last)];
+          }
+          return [...prev, update({ type: 'bot', content: '', streaming: true })];
+        });
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+          const eventLine = raw.split('\n').find(line => line.startsWith('event: '));
+          const dataLine = raw.split('\n').find(line => line.startsWith('data: '));
+          if (!eventLine || !dataLine) continue;
+          const event = eventLine.slice(7);
+          const data = JSON.parse(dataLine.slice(6));
+
+          if (event === 'token') {
+            setIsBotTyping(false);
+            updateBotMessage(msg => ({ ...msg, content: msg.content + data.text }));
+          } else if (event === 'done') {
+            updateBotMessage(() => ({ type: 'bot', content: data.response }));
+            setConversationId(data.conversation_id);
+          } else if (event === 'error') {
+            throw new Error(data.error);
+          }
+        }
       }
-
-      setMessages(prev => [...prev, { type: 'bot', content: data.response }]);
     } catch (error) {
       alert(error.message);
       console.error(error);
@@ -112,7 +148,9 @@ const Chatbot = () => {
                 className={`message-bubble ${
                   msg.type === 'user' ? 'user-message' : 'bot-message'
                 }`}
-                dangerouslySetInnerHTML={{ __html: msg.content }}
+                {...(msg.streaming
+                  ? { children: msg.content }
+                  : { dangerouslySetInnerHTML: { __html: msg.content } })}
               />
             ))}
             {isBotTyping && (
@@ -6,37 +6,43 @@ const ChatHistory = () => {
   const [history, setHistory] = useState([]);
   const [error, setError] = useState(null);
   const [rawResponse, setRawResponse] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const navigate = useNavigate();
 
-  useEffect(() => {
-    const fetchHistory = async () => {
-      try {
-        const response = await fetch('http://localhost:5000/api/history', {
-          method: 'GET',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          credentials: 'include',
-        });
-
-        if (!response.ok) {
-          const text = await response.text();
-          setRawResponse(text);
-          if (response.status === 401) {
-            window.location.href = '/login';
-            return;
-          }
-          throw new Error(`HTTP error ${response.status}: ${text}`);
+  // History is paginated by the backend; each page returns the cursor for the next one
+  const fetchHistory = async (cursor = null) => {
+    try {
+      const url = cursor
+        ? `http://localhost:5000/api/history?cursor=${encodeURIComponent(cursor)}`
+        : 'http://localhost:5000/api/history';
+      const response = await fetch(url, {
+        method: 'GET',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+      });
+
+      if (!response.ok) {
+        const text = await response.text();
+        setRawResponse(text);
+        if (response.status === 401) {
+          window.location.href = '/login';
+          return;
         }
-
-        const data = await response.json();
-        setHistory(data.history || []);
-      } catch (err) {
-        setError(err.message);
-        console.error('Fetch error:', err);
+        throw new Error(`HTTP error ${response.status}: ${text}`);
       }
-    };
 
+      const data = await response.json();
+      setHistory(prev => (cursor ? [...prev, ...(data.history || [])] : data.history || []));
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      setError(err.message);
+      console.error('Fetch error:', err);
+    }
+  };
+
+  useEffect(() => {
     fetchHistory();
   }, []);
 
@@ -99,6 +105,11 @@ const ChatHistory = () => {
                 </button>
               </div>
             ))}
+            {nextCursor && (
+              <button onClick={() => fetchHistory(nextCursor)} className="view-button">
+                Load More
+              </button>
+            )}
           </div>
 
           <div className="card-footer">
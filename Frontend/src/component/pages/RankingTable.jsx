@@ -3,23 +3,6 @@ import { useNavigate } from 'react-router-dom';
 import Footer from '../Layout/Footer';
 import Navbar from '../Layout/Navbar';
 
-const cities = [
-  "Lahore", "Karachi", "Faisalabad", "Gujranwala", "Peshawar",
-  "Islamabad", "Rawalpindi", "Sialkot", "Multan", "Quetta",
-  "Sheikhupura", "Bahawalpur", "Sargodha", "Hyderabad", "Okara"
-];
-
-const apiKey = "NZBaTfW3v1NkMEJvs/Ds/g==3avSnMBjl9A9nlrq";
-
-const getAirQualityDescription = (aqi) => {
-  if (aqi <= 50) return { level: "Good", color: "#4CAF50" };
-  if (aqi <= 100) return { level: "Moderate", color: "#FFCA28" };
-  if (aqi <= 150) return { level: "Unhealthy for Sensitive Groups", color: "#FF5722" };
-  if (aqi <= 200) return { level: "Unhealthy", color: "#D81B60" };
-  if (aqi <= 300) return { level: "Very Unhealthy", color: "#8E24AA" };
-  return { level: "Hazardous", color: "#5E35B1" };
-};
-
 const RankingTable = () => {
   const [aqiData, setAqiData] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -49,35 +32,14 @@ const RankingTable = () => {
     const fetchAQIData = async () => {
       setLoading(true);
       try {
-        const promises = cities.map(async (city) => {
-          try {
-            const response = await fetch(
-              `https://api.api-ninjas.com/v1/airquality?city=${encodeURIComponent(city)}`,
-              { headers: { "X-Api-Key": apiKey } }
-            );
-            if (!response.ok) throw new Error(`Failed for ${city}`);
-            const data = await response.json();
-            if (data && data.overall_aqi !== undefined) {
-              const qualityInfo = getAirQualityDescription(data.overall_aqi);
-              return {
-                city,
-                aqi: data.overall_aqi,
-                quality: qualityInfo.level,
-                color: qualityInfo.color
-              };
-            }
-            return { city, aqi: "N/A", quality: "Data not available", color: "#B0BEC5" };
-          } catch (error) {
-            return { city, aqi: "Error", quality: "Error fetching data", color: "#B0BEC5" };
-          }
+        // Ranking is computed and kept fresh by the backend
+        const response = await fetch('http://localhost:5000/api/rankings', {
+          credentials: 'include'
         });
+        if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+        const data = await response.json();
 
-        const results = await Promise.all(promises);
-        const validData = results.filter(item => typeof item.aqi === "number");
-        validData.sort((a, b) => b.aqi - a.aqi); // Fixed typo: b.qi to b.aqi
-        const errorData = results.filter(item => typeof item.aqi !== "number");
-
-        setAqiData([...validData, ...errorData]);
+        setAqiData(data.rankings || []);
         setErrorMsg("");
       } catch (error) {
         console.error(error);
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import re
+import threading
+import time
+from gemini_config import model
+from metrics import gemini_timer
+from config import Config
+
+AQI_LEVELS = (1, 2, 3, 4, 5)
+
+RECOMMENDATIONS_PROMPT = "Provide broader recommendations for dealing with current air quality issues at AQI level {aqi} in 3-4 lines without any Markdown or formatting."
+SUGGESTIONS_PROMPT = "Provide broader long-term suggestions for dealing with air quality issues at AQI level {aqi} in 3-4 lines without any Markdown or formatting."
+STRUCTURED_PROMPT = (
+    "Provide advice for dealing with air quality issues at AQI level {aqi}. "
+    "Respond only with a JSON object with two string fields: "
+    "\"recommendations\", broader recommendations for dealing with the current air quality in 3-4 lines, and "
+    "\"suggestions\", broader long-term suggestions for dealing with air quality issues in 3-4 lines. "
+    "Do not use any Markdown or formatting inside the strings."
+)
+
+ERROR_ADVICE = ("Error fetching recommendations.", "Error fetching suggestions.")
+
+def truncate_text(text, max_lines=4):
+    if not text:
+        return ""
+    lines = text.splitlines()
+    return '\n'.join(lines[:max_lines])
+
+def clean_text(text):
+    return truncate_text(re.sub(r'[\*\_]', '', text))
+
+def parse_advice(text):
+    # Validate the structured reply and normalise it to the same contract as the separate prompts
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Advice response is not a JSON object.")
+
+    advice = []
+    for field in ('recommendations', 'suggestions'):
+        value = data.get(field)
+        if isinstance(value, list):
+            value = '\n'.join(str(item) for item in value)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Advice response is missing '{field}'.")
+        advice.append(clean_text(value.strip()))
+    return tuple(advice)
+
+def generate_advice_structured(aqi):
+    # One round-trip for both fields instead of two calls on a growing chat history
+    response = model.generate_content(
+        STRUCTURED_PROMPT.format(aqi=aqi),
+        generation_config={"response_mime_type": "application/json"},
+    )
+    return parse_advice(response.text)
+
+def generate_advice_separate(aqi):
+    chat_session = model.start_chat(history=[])
+    recommendations_response = chat_session.send_message(RECOMMENDATIONS_PROMPT.format(aqi=aqi))
+    suggestions_response = chat_session.send_message(SUGGESTIONS_PROMPT.format(aqi=aqi))
+    return clean_text(recommendations_response.text), clean_text(suggestions_response.text)
+
+def generate_advice(aqi):
+    if Config.ADVICE_MODE == 'structured':
+        try:
+            with gemini_timer('advice'):
+                return generate_advice_structured(aqi)
+        except ValueError as e:  # also covers json.JSONDecodeError
+            print(f"Structured advice unusable for AQI {aqi}, using separate prompts: {e}")
+    with gemini_timer('advice'):
+        return generate_advice_separate(aqi)
+
+
+class AdviceStore:
+    # Recommendations/suggestions only depend on the AQI level (1-5), so they are generated
+    # once per level and reused. Expired entries keep being served while a background
+    # refresh runs, and a failed refresh leaves the last good value in place.
+
+    def __init__(self, generate, ttl, retry_after=60, workers=2):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._generate = generate
+        self._entries = {}  # aqi -> (generated_at, (recommendations, suggestions))
+        self._inflight = {}  # aqi -> Future of a running generation
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='advice')
+
+    def cached(self, aqi):
+        # Non-blocking lookup: the stored advice (refreshing it in the background once
+        # expired), or None if this level has never been generated
+        aqi = int(aqi)
+        with self._lock:
+            entry = self._entries.get(aqi)
+
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            self.refresh(aqi)
+        return entry[1]
+
+    def get(self, aqi, timeout=None):
+        aqi = int(aqi)
+        advice = self.cached(aqi)
+        if advice is not None:
+            return advice
+
+        # First time this level is seen: wait for (or join) the generation
+        try:
+            return self.refresh(aqi).result(timeout=timeout)
+        except Exception as e:
+            print(f"Error with Gemini API: {e!r}")
+            return ERROR_ADVICE
+
+    def refresh(self, aqi):
+        with self._lock:
+            future = self._inflight.get(aqi)
+            if future is None:
+                future = self._executor.submit(self._regenerate, aqi)
+                self._inflight[aqi] = future
+            return future
+
+    def prewarm(self, levels=AQI_LEVELS):
+        for aqi in levels:
+            self.refresh(aqi)
+
+    def _regenerate(self, aqi):
+        try:
+            advice = self._generate(aqi)
+            with self._lock:
+                self._entries[aqi] = (time.monotonic(), advice)
+            return advice
+        except Exception as e:
+            print(f"Advice refresh failed for AQI {aqi}: {e!r}")
+            with self._lock:
+                entry = self._entries.get(aqi)
+                if entry is not None:
+                    # keep serving the last good value, retry after `retry_after` seconds
+                    self._entries[aqi] = (time.monotonic() - self.ttl + self.retry_after, entry[1])
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(aqi, None)
+
+
+advice_store = AdviceStore(generate_advice, Config.ADVICE_TTL, Config.ADVICE_RETRY_AFTER)
@@ -1,22 +1,246 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+import asyncio
 from datetime import datetime
+import threading
 import requests
-import re
-from gemini_config import model
+from advice import advice_store
+from cache import TTLCache, grid_key
+from forecast import empty_forecast, transform_forecast
+from timeseries import reading_recorder
+from metrics import approximate_lookups, stage_seconds, watch_cache
+from spatial import ReadingIndex, interpolate_reading
+from throttle import AsyncSingleFlight, SingleFlight, UpstreamUnavailable
+from upstream import async_upstream, upstream
+from config import Config
 import os
 
-def get_air_pollution_data(request_data):
-    air_pollution_data = None
-    recommendations = None
-    suggestions = None
-    weekly_forecast = []
-    hourly_data = []
-    hourly_pm25 = []
-    hourly_pm10 = []
-    selected_time = None
-    selected_aqi = None
-    daily_data = []
-    selected_date = None  # Initialize
+# Upstream payloads cached per grid cell; forecasts change far less often than current readings.
+# Expired payloads stay available for AIR_CACHE_STALE_TTL as the last good data for the cell.
+current_cache = TTLCache(Config.AIR_CACHE_CURRENT_TTL, Config.AIR_CACHE_MAX_ENTRIES, Config.AIR_CACHE_STALE_TTL)
+forecast_cache = TTLCache(Config.AIR_CACHE_FORECAST_TTL, Config.AIR_CACHE_MAX_ENTRIES, Config.AIR_CACHE_STALE_TTL)
+watch_cache('air_current', current_cache)
+watch_cache('air_forecast', forecast_cache)
+
+# Concurrent cache misses for the same cell and endpoint share one upstream call
+openweather_flight = SingleFlight('openweather')
+async_openweather_flight = AsyncSingleFlight('openweather')
+
+# Where recent current readings were fetched, so a request near one can be answered
+# without going upstream (request body "approximate": "nearest" or "interpolate")
+APPROXIMATIONS = ('nearest', 'interpolate')
+reading_index = ReadingIndex(Config.AIR_APPROX_RADIUS_KM, Config.AIR_APPROX_MAX_AGE, Config.AIR_APPROX_MAX_ENTRIES)
+
+def current_url(latitude, longitude, api_key):
+    return f'{Config.OPENWEATHER_BASE_URL}/air_pollution?lat={latitude}&lon={longitude}&appid={api_key}&units=metric'
+
+def forecast_url(latitude, longitude, api_key):
+    return f'{Config.OPENWEATHER_BASE_URL}/air_pollution/forecast?lat={latitude}&lon={longitude}&appid={api_key}&units=metric'
+
+def store_current_data(key, current_data, latitude, longitude):
+    # Ensure 'list' is in the response
+    if 'list' not in current_data:
+        raise ValueError("Invalid response from air pollution API.")
+    current_cache.set(key, current_data)
+    reading_index.add(key, latitude, longitude, current_data)
+    reading_recorder.record(key, current_data)  # only fresh upstream readings are stored
+    return current_data
+
+def store_forecast_data(key, forecast_data):
+    # Ensure 'list' is in the forecast data
+    if 'list' not in forecast_data:
+        raise ValueError("Invalid response from forecast API.")
+    forecast_cache.set(key, forecast_data)
+    return forecast_data
+
+def request_current_data(key, latitude, longitude, api_key):
+    current_response = upstream.get(current_url(latitude, longitude, api_key))
+    current_response.raise_for_status()  # Check if the request was successful
+    return store_current_data(key, current_response.json(), latitude, longitude)
+
+def request_forecast_data(key, latitude, longitude, api_key):
+    forecast_response = upstream.get(forecast_url(latitude, longitude, api_key))
+    forecast_response.raise_for_status()
+    return store_forecast_data(key, forecast_response.json())
+
+# Background refreshes of expired entries, at most one per cell and endpoint at a time
+refresh_executor = ThreadPoolExecutor(max_workers=Config.AIR_REFRESH_WORKERS, thread_name_prefix='air-refresh')
+refreshing = set()
+refreshing_lock = threading.Lock()
+
+def revalidate(flight_key, request, key, latitude, longitude, api_key):
+    with refreshing_lock:
+        if flight_key in refreshing:
+            return
+        refreshing.add(flight_key)
+
+    def refresh():
+        try:
+            openweather_flight.do(flight_key, request, key, latitude, longitude, api_key)
+        except Exception as e:  # the stale entry keeps being served; the next request retries
+            print(f"Background refresh of {flight_key} failed: {e!r}")
+        finally:
+            with refreshing_lock:
+                refreshing.discard(flight_key)
+    refresh_executor.submit(refresh)
+
+def cached_or_stale(cache, flight_key, request, key, latitude, longitude, api_key):
+    # Stale-while-revalidate: (data, None) for a fresh entry; for an expired one, the last
+    # good data and its age right away, with a refresh started in the background. A slow
+    # or failing OpenWeather then only delays the refresh, never the response.
+    data = cache.get(key)
+    if data is not None:
+        return data, None
+    stale = cache.get_stale(key)
+    if stale is not None:
+        revalidate(flight_key, request, key, latitude, longitude, api_key)
+    return stale
+
+def oldest(*ages):
+    ages = [age for age in ages if age is not None]
+    return max(ages) if ages else None
+
+def fetch_current_data(latitude, longitude, api_key):
+    # (current_data, stale_age): stale_age is None unless an expired reading was served
+    key = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    cached = cached_or_stale(current_cache, ('current', key), request_current_data, key, latitude, longitude, api_key)
+    if cached is not None:
+        return cached
+    return openweather_flight.do(('current', key), request_current_data, key, latitude, longitude, api_key), None
+
+def fetch_forecast_data(latitude, longitude, api_key):
+    key = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    cached = cached_or_stale(forecast_cache, ('forecast', key), request_forecast_data, key, latitude, longitude, api_key)
+    if cached is not None:
+        return cached
+    return openweather_flight.do(('forecast', key), request_forecast_data, key, latitude, longitude, api_key), None
+
+# Shared, bounded pool used to fan out the independent upstream calls of a request
+fetch_executor = ThreadPoolExecutor(max_workers=Config.AIR_FETCH_WORKERS, thread_name_prefix='air-fetch')
+# Separate pool for batch requests; its size caps how many locations are fetched at once
+batch_executor = ThreadPoolExecutor(max_workers=Config.AIR_BATCH_CONCURRENCY, thread_name_prefix='air-batch')
+
+def build_current_data(current_data, info):
+    aqi = current_data['list'][0]['main']['aqi']
+    current_timestamp = current_data['list'][0]['dt']
+    formatted_time = datetime.fromtimestamp(current_timestamp).strftime('%I:%M %p')
+
+    return {
+        'info': info,
+        'aqi': aqi,
+        'co': current_data['list'][0]['components']['co'],
+        'no': current_data['list'][0]['components']['no'],
+        'no2': current_data['list'][0]['components']['no2'],
+        'o3': current_data['list'][0]['components']['o3'],
+        'so2': current_data['list'][0]['components']['so2'],
+        'pm2_5': current_data['list'][0]['components']['pm2_5'],
+        'pm10': current_data['list'][0]['components']['pm10'],
+        'nh3': current_data['list'][0]['components']['nh3'],
+        'dt': datetime.fromtimestamp(current_timestamp).strftime('%A, %B %d, %Y at %I:%M %p'),
+        'day': datetime.fromtimestamp(current_timestamp).strftime('%A'),
+        'date': datetime.fromtimestamp(current_timestamp).strftime('%d %b %Y'), 
+        'time': formatted_time  
+    }
+
+def fetch_sequential(latitude, longitude, api_key):
+    # Original behaviour: one round-trip after another, any upstream failure fails the request
+    current_data, current_age = fetch_current_data(latitude, longitude, api_key)
+    aqi = current_data['list'][0]['main']['aqi']
+    with stage_seconds.time(stage='advice'):
+        recommendations, suggestions = advice_store.get(aqi, timeout=Config.AIR_FETCH_TIMEOUT)
+    forecast_data, forecast_age = fetch_forecast_data(latitude, longitude, api_key)
+    with stage_seconds.time(stage='forecast_transform'):
+        forecast = transform_forecast(forecast_data)
+    return current_data, recommendations, suggestions, forecast, oldest(current_age, forecast_age)
+
+def fetch_concurrent(latitude, longitude, api_key):
+    # Current and forecast GETs start together; the advice only needs the current AQI,
+    # so it is looked up as soon as it arrives while the forecast is still in flight.
+    timeout = Config.AIR_FETCH_TIMEOUT
+    current_future = fetch_executor.submit(fetch_current_data, latitude, longitude, api_key)
+    forecast_future = fetch_executor.submit(fetch_forecast_data, latitude, longitude, api_key)
+
+    try:
+        current_data, current_age = current_future.result(timeout=timeout)
+    except TimeoutError:
+        forecast_future.cancel()
+        raise requests.exceptions.Timeout("Air pollution API timed out.")
+    except Exception:
+        forecast_future.cancel()
+        raise
+
+    aqi = current_data['list'][0]['main']['aqi']
+    # Partial failures degrade the response instead of failing it
+    with stage_seconds.time(stage='advice'):
+        recommendations, suggestions = advice_store.get(aqi, timeout=timeout)
+
+    forecast_age = None
+    try:
+        forecast_data, forecast_age = forecast_future.result(timeout=timeout)
+        with stage_seconds.time(stage='forecast_transform'):
+            forecast = transform_forecast(forecast_data)
+    except Exception as e:
+        print(f"Forecast unavailable: {e!r}")
+        forecast = empty_forecast()
+
+    return current_data, recommendations, suggestions, forecast, oldest(current_age, forecast_age)
+
+def approximate_current(latitude, longitude, method):
+    # The current reading for a location built from fresh readings nearby: the closest
+    # one, or an inverse-distance blend of up to AIR_APPROX_NEIGHBOURS. None when this
+    # very cell has a fresh reading (the normal path serves it from the cache), when
+    # nothing is within AIR_APPROX_RADIUS_KM, or when the closest reading is this cell's.
+    key = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    if key in current_cache:  # not counted: the cache lookup that serves it follows
+        approximate_lookups.inc(method=method, outcome='cached')
+        return None
+    limit = 1 if method == 'nearest' else Config.AIR_APPROX_NEIGHBOURS
+    neighbours = reading_index.nearby(latitude, longitude, Config.AIR_APPROX_RADIUS_KM, limit)
+    if not neighbours or neighbours[0][2] == key:
+        approximate_lookups.inc(method=method, outcome='miss')
+        return None
+    approximate_lookups.inc(method=method, outcome='hit')
+
+    current_data = neighbours[0][3] if method == 'nearest' else interpolate_reading(neighbours)
+    details = {
+        'method': method,
+        'sources': len(neighbours),
+        'distance_km': round(neighbours[0][0], 2),  # to the closest source
+        'age_seconds': int(max(age for _, age, _, _ in neighbours)),  # of the oldest source
+    }
+    return current_data, details, [key for _, _, key, _ in neighbours]
 
+def cached_forecast(keys):
+    # Forecasts vary slowly over a few kilometres; reuse the closest source's
+    for key in keys:
+        forecast_data = forecast_cache.get(key)
+        if forecast_data is not None:
+            return forecast_data
+    return None
+
+def fetch_approximate(latitude, longitude, api_key, method):
+    approximation = approximate_current(latitude, longitude, method)
+    if approximation is None:
+        return None
+    current_data, details, sources = approximation
+
+    aqi = current_data['list'][0]['main']['aqi']
+    with stage_seconds.time(stage='advice'):
+        recommendations, suggestions = advice_store.get(aqi, timeout=Config.AIR_FETCH_TIMEOUT)
+
+    forecast_age = None
+    try:
+        forecast_data = cached_forecast(sources)
+        if forecast_data is None:
+            forecast_data, forecast_age = fetch_forecast_data(latitude, longitude, api_key)
+        with stage_seconds.time(stage='forecast_transform'):
+            forecast = transform_forecast(forecast_data)
+    except Exception as e:
+        print(f"Forecast unavailable: {e!r}")
+        forecast = empty_forecast()
+
+    return current_data, recommendations, suggestions, forecast, forecast_age, details
+
+def parse_request(request_data):
     Latitude = request_data.get('latitude')
     Longitude = request_data.get('longitude')
     info = request_data.get('placeInfo', 'Unknown')
@@ -25,151 +249,223 @@ def get_air_pollution_data(request_data):
     # Validate that latitude and longitude are present
     if not Latitude or not Longitude:
         raise ValueError("Latitude and Longitude are required fields.")
+    if request_data.get('approximate') not in (None, *APPROXIMATIONS):
+        raise ValueError(f"approximate must be one of: {', '.join(APPROXIMATIONS)}")
+    return Latitude, Longitude, info, API_KEY
 
-    try:
-        # === Current Air Quality ===
-        current_url = f'http://api.openweathermap.org/data/2.5/air_pollution?lat={Latitude}&lon={Longitude}&appid={API_KEY}&units=metric'
-        current_response = requests.get(current_url, timeout=10)  # Added timeout to avoid hanging requests
-        current_response.raise_for_status()  # Check if the request was successful
-        current_data = current_response.json()
-
-        # Ensure 'list' is in the response
-        if 'list' not in current_data:
-            raise ValueError("Invalid response from air pollution API.")
+def build_result(info, current_data=None, recommendations=None, suggestions=None, forecast=None,
+                 stale_age=None, approximation=None):
+    forecast = forecast or empty_forecast()
+    air_pollution_data = None
+    selected_time = None
+    selected_aqi = None
+    selected_date = None
 
-        aqi = current_data['list'][0]['main']['aqi']
-        current_timestamp = current_data['list'][0]['dt']
+    if current_data is not None:
+        # === Current Air Quality ===
         selected_time = datetime.now().strftime('%I:%M:%S %p')
         selected_date = datetime.now().strftime('%Y-%m-%d')
-        formatted_time = datetime.fromtimestamp(current_timestamp).strftime('%I:%M %p')
-
-        air_pollution_data = {
-            'info': info,
-            'aqi': aqi,
-            'co': current_data['list'][0]['components']['co'],
-            'no': current_data['list'][0]['components']['no'],
-            'no2': current_data['list'][0]['components']['no2'],
-            'o3': current_data['list'][0]['components']['o3'],
-            'so2': current_data['list'][0]['components']['so2'],
-            'pm2_5': current_data['list'][0]['components']['pm2_5'],
-            'pm10': current_data['list'][0]['components']['pm10'],
-            'nh3': current_data['list'][0]['components']['nh3'],
-            'dt': datetime.fromtimestamp(current_timestamp).strftime('%A, %B %d, %Y at %I:%M %p'),
-            'day': datetime.fromtimestamp(current_timestamp).strftime('%A'),
-            'date': datetime.fromtimestamp(current_timestamp).strftime('%d %b %Y'), 
-            'time': formatted_time  
-        }
-
-        # === Recommendations & Suggestions ===
-        try:
-            chat_session = model.start_chat(history=[])
-            recommendations_response = chat_session.send_message(
-                f"Provide broader recommendations for dealing with current air quality issues at AQI level {aqi} in 3-4 lines without any Markdown or formatting."
-            )
-            suggestions_response = chat_session.send_message(
-                f"Provide broader long-term suggestions for dealing with air quality issues at AQI level {aqi} in 3-4 lines without any Markdown or formatting."
-            )
-
-            recommendations = truncate_text(re.sub(r'[\*\_]', '', recommendations_response.text))
-            suggestions = truncate_text(re.sub(r'[\*\_]', '', suggestions_response.text))
-
-        except Exception as e:
-            print(f"Error with Gemini API: {e}")
-            recommendations = "Error fetching recommendations."
-            suggestions = "Error fetching suggestions."
-
-        # === Forecast Data ===
-        forecast_url = f'http://api.openweathermap.org/data/2.5/air_pollution/forecast?lat={Latitude}&lon={Longitude}&appid={API_KEY}&units=metric'
-        forecast_response = requests.get(forecast_url, timeout=10)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-
-        # Ensure 'list' is in the forecast data
-        if 'list' not in forecast_data:
-            raise ValueError("Invalid response from forecast API.")
-
-        current_date = None
-        forecast_group = None
-
-        for forecast in forecast_data['list']:
-            forecast_timestamp = forecast['dt']
-            forecast_date = datetime.fromtimestamp(forecast_timestamp).strftime('%d %b %Y')
-            forecast_day = datetime.fromtimestamp(forecast_timestamp).strftime('%A')
-
-            if forecast_date != current_date:
-                if forecast_group:
-                    weekly_forecast.append(forecast_group)
-                forecast_group = {
-                    'day': forecast_day,
-                    'date': forecast_date,
-                    'aqi': forecast['main']['aqi'],
-                    'co': forecast['components']['co'],
-                    'pm2_5': forecast['components']['pm2_5'],
-                    'forecasts': []
-                }
-                current_date = forecast_date
-
-            forecast_item = {
-                'aqi': forecast['main']['aqi'],
-                'co': forecast['components']['co'],
-                'pm2_5': forecast['components']['pm2_5'],
-            }
-            forecast_group['forecasts'].append(forecast_item)
-
-        if forecast_group:
-            weekly_forecast.append(forecast_group)
-
-        # === Hourly Data ===
-        for data in forecast_data['list']:
-            time_str = datetime.fromtimestamp(data['dt']).strftime('%H:%M:%S')
-            hourly_data.append({'time': time_str, 'value': data['main']['aqi']})
-            hourly_pm25.append({'time': time_str, 'value': data['components']['pm2_5']})
-            hourly_pm10.append({'time': time_str, 'value': data['components']['pm10']})
-
-        # === Daily Aggregation ===
-        seen_dates = set()
-        for forecast in forecast_data['list']:
-            forecast_date = datetime.fromtimestamp(forecast['dt']).strftime('%Y-%m-%d')
-            if forecast_date not in seen_dates:
-                seen_dates.add(forecast_date)
-                daily_data.append({
-                    'date': forecast_date,
-                    'aqi': forecast['main']['aqi'],
-                    'pm2_5': forecast['components'].get('pm2_5', 0),
-                    'pm10': forecast['components'].get('pm10', 0),
-                    'co': forecast['components'].get('co', 0),
-                    'o3': forecast['components'].get('o3', 0),
-                    'so2': forecast['components'].get('so2', 0),
-                })
-
-    except requests.exceptions.RequestException as e:
-        air_pollution_data = None
-        recommendations = "Error fetching air pollution data."
-        suggestions = "Please try again later."
-        print(f"Request failed: {e}")
-
-    except ValueError as e:
-        air_pollution_data = None
-        recommendations = str(e)
-        suggestions = "Please check the data provided."
-        print(f"Error: {e}")
+        air_pollution_data = build_current_data(current_data, info)
 
     return {
         'air_pollution_data': air_pollution_data,
         'recommendations': recommendations,
         'suggestions': suggestions,
-        'weekly_forecast': weekly_forecast,
-        'hourly_data': hourly_data,
-        'hourly_pm25': hourly_pm25,
-        'hourly_pm10': hourly_pm10,
+        'weekly_forecast': forecast['weekly_forecast'],
+        'hourly_data': forecast['hourly_data'],
+        'hourly_pm25': forecast['hourly_pm25'],
+        'hourly_pm10': forecast['hourly_pm10'],
         'selected_time': selected_time,
         'selected_aqi': selected_aqi,
-        'daily_data': daily_data,
-        'selected_date': selected_date
+        'daily_data': forecast['daily_data'],
+        'selected_date': selected_date,
+        # Answered from readings nearby rather than for this location; approximation
+        # says how (method, number of sources, distance and age)
+        'approximated': approximation is not None,
+        **({'approximation': approximation} if approximation is not None else {}),
+        # Served from the last good data while a refresh runs in the background
+        'stale': stale_age is not None,
+        **({'stale_age_seconds': int(stale_age)} if stale_age is not None else {}),
     }
 
-def truncate_text(text, max_lines=4):
-    if not text:
-        return ""
-    lines = text.splitlines()
-    return '\n'.join(lines[:max_lines])
+def request_error_result(info, e):
+    print(f"Request failed: {e}")
+    return build_result(info, recommendations="Error fetching air pollution data.", suggestions="Please try again later.")
+
+def value_error_result(info, e):
+    print(f"Error: {e}")
+    return build_result(info, recommendations=str(e), suggestions="Please check the data provided.")
+
+def get_air_pollution_data(request_data, fetch_mode=None):
+    # fetch_mode overrides AIR_FETCH_MODE for this call
+    Latitude, Longitude, info, API_KEY = parse_request(request_data)
+
+    try:
+        if request_data.get('approximate'):
+            approximate = fetch_approximate(Latitude, Longitude, API_KEY, request_data['approximate'])
+            if approximate is not None:
+                return build_result(info, *approximate)
+        if (fetch_mode or Config.AIR_FETCH_MODE) == 'sequential':
+            return build_result(info, *fetch_sequential(Latitude, Longitude, API_KEY))
+        return build_result(info, *fetch_concurrent(Latitude, Longitude, API_KEY))
+
+    except requests.exceptions.RequestException as e:
+        return request_error_result(info, e)
+
+    except ValueError as e:
+        return value_error_result(info, e)
+
+# === Async variants, used by the ASGI entry point (asgi.py) ===
+
+async def request_current_data_async(key, latitude, longitude, api_key):
+    current_response = await async_upstream.get(current_url(latitude, longitude, api_key))
+    current_response.raise_for_status()
+    return store_current_data(key, current_response.json(), latitude, longitude)
+
+async def request_forecast_data_async(key, latitude, longitude, api_key):
+    forecast_response = await async_upstream.get(forecast_url(latitude, longitude, api_key))
+    forecast_response.raise_for_status()
+    return store_forecast_data(key, forecast_response.json())
+
+async def fetch_current_data_async(latitude, longitude, api_key):
+    # Expired entries are refreshed on the background thread pool, as in the sync path
+    key = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    cached = cached_or_stale(current_cache, ('current', key), request_current_data, key, latitude, longitude, api_key)
+    if cached is not None:
+        return cached
+    current_data = await async_openweather_flight.do(
+        ('current', key), request_current_data_async, key, latitude, longitude, api_key)
+    return current_data, None
+
+async def fetch_forecast_data_async(latitude, longitude, api_key):
+    key = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    cached = cached_or_stale(forecast_cache, ('forecast', key), request_forecast_data, key, latitude, longitude, api_key)
+    if cached is not None:
+        return cached
+    forecast_data = await async_openweather_flight.do(
+        ('forecast', key), request_forecast_data_async, key, latitude, longitude, api_key)
+    return forecast_data, None
+
+async def fetch_approximate_async(latitude, longitude, api_key, method):
+    approximation = approximate_current(latitude, longitude, method)
+    if approximation is None:
+        return None
+    current_data, details, sources = approximation
+
+    aqi = current_data['list'][0]['main']['aqi']
+    with stage_seconds.time(stage='advice'):
+        advice = advice_store.cached(aqi)
+        if advice is None:
+            advice = await asyncio.to_thread(advice_store.get, aqi, Config.AIR_FETCH_TIMEOUT)
+    recommendations, suggestions = advice
+
+    forecast_age = None
+    try:
+        forecast_data = cached_forecast(sources)
+        if forecast_data is None:
+            forecast_data, forecast_age = await asyncio.wait_for(
+                fetch_forecast_data_async(latitude, longitude, api_key), Config.AIR_FETCH_TIMEOUT)
+        with stage_seconds.time(stage='forecast_transform'):
+            forecast = transform_forecast(forecast_data)
+    except Exception as e:
+        print(f"Forecast unavailable: {e!r}")
+        forecast = empty_forecast()
+
+    return current_data, recommendations, suggestions, forecast, forecast_age, details
+
+async def get_air_pollution_data_async(request_data):
+    # Same pipeline and result as fetch_concurrent, but awaiting non-blocking clients
+    # instead of holding pool threads while OpenWeather responds
+    import httpx
+
+    Latitude, Longitude, info, API_KEY = parse_request(request_data)
+    timeout = Config.AIR_FETCH_TIMEOUT
+
+    if request_data.get('approximate'):
+        approximate = await fetch_approximate_async(Latitude, Longitude, API_KEY, request_data['approximate'])
+        if approximate is not None:
+            return build_result(info, *approximate)
+
+    forecast_task = asyncio.create_task(fetch_forecast_data_async(Latitude, Longitude, API_KEY))
+    try:
+        current_data, current_age = await asyncio.wait_for(fetch_current_data_async(Latitude, Longitude, API_KEY), timeout)
+    except (httpx.HTTPError, asyncio.TimeoutError) as e:
+        forecast_task.cancel()
+        return request_error_result(info, repr(e))
+    except ValueError as e:
+        forecast_task.cancel()
+        return value_error_result(info, e)
+    except UpstreamUnavailable:
+        forecast_task.cancel()
+        raise  # answered with 429/503 by the route
+
+    aqi = current_data['list'][0]['main']['aqi']
+    # Seen AQI levels are answered from memory; only a first-seen level waits on Gemini
+    with stage_seconds.time(stage='advice'):
+        advice = advice_store.cached(aqi)
+        if advice is None:
+            advice = await asyncio.to_thread(advice_store.get, aqi, timeout)
+    recommendations, suggestions = advice
+
+    forecast_age = None
+    try:
+        forecast_data, forecast_age = await asyncio.wait_for(forecast_task, timeout)
+        with stage_seconds.time(stage='forecast_transform'):
+            forecast = transform_forecast(forecast_data)
+    except Exception as e:
+        print(f"Forecast unavailable: {e!r}")
+        forecast = empty_forecast()
+
+    return build_result(info, current_data, recommendations, suggestions, forecast, oldest(current_age, forecast_age))
+
+def get_air_pollution_batch(locations):
+    # Locations in the same grid cell share one fetch; unique cells are fetched concurrently.
+    # Results come back in request order, each with either 'data' or an 'error'. The whole
+    # batch shares one AIR_BATCH_TIMEOUT deadline; cells still pending then are reported
+    # as errors.
+    cells = []
+    futures = {}
+    for location in locations:
+        try:
+            cell = grid_key(location['latitude'], location['longitude'], Config.AIR_CACHE_CELL_DEG)
+        except (KeyError, TypeError, ValueError):
+            cells.append(None)
+            continue
+        cells.append(cell)
+        if cell not in futures:
+            # Sequential within each batch worker: the batch pool already provides the
+            # concurrency, and fanning out onto fetch_executor as well would let one cold
+            # batch take every slot that single-location requests need
+            futures[cell] = batch_executor.submit(get_air_pollution_data, location, 'sequential')
+
+    done, pending = wait(futures.values(), timeout=Config.AIR_BATCH_TIMEOUT)
+    for future in pending:
+        future.cancel()  # not started yet: don't spend a worker on a result nobody reads
+
+    results = []
+    for location, cell in zip(locations, cells):
+        item = {'latitude': location.get('latitude'), 'longitude': location.get('longitude')} if isinstance(location, dict) else {}
+        if cell is None:
+            item['error'] = "Latitude and Longitude are required fields."
+            results.append(item)
+            continue
+
+        if futures[cell] not in done:
+            item['error'] = "Timed out fetching air pollution data."
+            results.append(item)
+            continue
+        try:
+            data = futures[cell].result()
+        except Exception as e:
+            item['error'] = str(e) or "Unable to fetch air pollution data."
+            results.append(item)
+            continue
+
+        if data['air_pollution_data'] is None:
+            item['error'] = data['recommendations']
+        else:
+            # shared result, but each location keeps its own place label
+            item['data'] = dict(data, air_pollution_data=dict(
+                data['air_pollution_data'], info=location.get('placeInfo', 'Unknown')))
+        results.append(item)
+    return results
@@ -1,51 +1,136 @@
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from models import db, User, ChatHistory
+import database  # SQLite connection tuning
 from forms import SignupForm, LoginForm
 from gemini_config import model
-from air_pollution import get_air_pollution_data
+from air_pollution import APPROXIMATIONS, get_air_pollution_batch, get_air_pollution_data
+from advice import advice_store
+from rankings import ranking_service
+from jobs import job_queue
+from timeseries import RESOLUTIONS, reading_recorder, reading_trend
+from cache import grid_key
+from users import invalidate_user, load_user
+from conversation import build_context, get_or_create_conversation, schedule_summary
+from retention import archive_months
+from search import search_history
+from throttle import UpstreamUnavailable
+import metrics
+import compression
+import payload
+from payload import compact_air_pollution, parse_options, select_fields
+from metrics import gemini_timer, stage_seconds
 from config import Config
-from flask_migrate import Migrate
 from markupsafe import Markup
 from werkzeug.datastructures import MultiDict
+import math
 import re
 import os
+import json
+import base64
 from flask_cors import CORS
 
-app = Flask(__name__)
-# Configure session cookies
-app.config.update(
-    SESSION_COOKIE_SAMESITE="None",
-    SESSION_COOKIE_SECURE=True
-)
-CORS(app, origins="http://localhost:5173", supports_credentials=True)
+api = Blueprint('api', __name__)
 
 API_KEY = os.getenv('API_NINJAS_KEY')
-migrate = Migrate(app, db)
-
-# DATABASE CONFIGURATION
-app.config.from_object(Config)
-db.init_app(app)
 
 # Initialize Login Manager
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'api_login'
+login_manager.login_view = 'api.api_login'
 
 @login_manager.unauthorized_handler
 def unauthorized():
     return jsonify({'error': 'Unauthorized access'}), 401
 
-@login_manager.user_loader
-def load_user(user_id):
-    return db.session.get(User, int(user_id))
-
-# APP CONFIGURATION
-app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=7)
+# Cached per user id, so authenticated requests usually skip the user lookup
+login_manager.user_loader(load_user)
+
+def create_app(config_object=Config, start_background=False):
+    # Application factory. Nothing here touches Gemini: the model client is created on
+    # the first LLM call (see gemini_config), so a new worker is ready to serve quickly.
+    # Background services only start for the serving entry points (wsgi.py, asgi.py,
+    # __main__ and `flask run`), never for other CLI commands such as `flask db upgrade`.
+    app = Flask(__name__)
+    # Configure session cookies
+    app.config.update(
+        SESSION_COOKIE_SAMESITE="None",
+        SESSION_COOKIE_SECURE=True
+    )
+    CORS(app, origins="http://localhost:5173", supports_credentials=True)
+
+    # DATABASE CONFIGURATION
+    app.config.from_object(config_object)
+    db.init_app(app)
+    # Flask-Migrate pulls in alembic; only the `flask db ...` commands need it
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    login_manager.init_app(app)
+
+    # APP CONFIGURATION
+    app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=7)
+
+    app.register_blueprint(api)
+
+    # orjson encoding for jsonify when it is installed
+    payload.init_app(app)
+
+    # Request, upstream and database timings, served at /metrics
+    if Config.METRICS_ENABLED:
+        metrics.init_app(app)
+
+    # gzip/brotli for large JSON responses; registered after metrics so the response
+    # size histogram sees the bytes actually sent
+    if Config.COMPRESSION_ENABLED:
+        compression.init_app(app)
+
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        start_background = cli_serves_requests()
+    if start_background:
+        start_services(app)
+    return app
+
+def cli_serves_requests():
+    # True when the app is being loaded by `flask run` in the process that will serve it.
+    # With the reloader the command runs twice; only the serving child qualifies.
+    import click
+    from flask.cli import get_debug_flag
+
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.info_name != 'run':
+        return False
+    reload = ctx.params.get('reload')
+    if reload is None:
+        reload = get_debug_flag()
+    return not reload or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+def start_services(app):
+    # Generate advice for every AQI level in the background so requests never wait on Gemini
+    if Config.ADVICE_PREWARM:
+        advice_store.prewarm()
+
+    # Keep the city ranking warm in the background; page views never reach the upstream API
+    if Config.RANKINGS_ENABLED:
+        ranking_service.start()
+
+    # Worker pool for deferred work such as chat title generation
+    job_queue.init_app(app)
+    job_queue.start()
+
+    # Move chat history past the retention window into the archive
+    if Config.HISTORY_RETENTION_DAYS > 0:
+        job_queue.schedule('chat_retention', Config.HISTORY_RETENTION_INTERVAL)
+
+    # Batched writer for the AQI reading history
+    reading_recorder.init_app(app)
+    reading_recorder.start()
+    # and readings older than the history API can return are deleted
+    job_queue.schedule('readings_prune', Config.READINGS_PRUNE_INTERVAL)
 
 # USER PROFILE ROUTE
-@app.route('/api/userprofile', methods=['GET'])
+@api.route('/api/userprofile', methods=['GET'])
 @login_required
 def get_user_profile():
     return jsonify({
@@ -55,7 +140,7 @@ def get_user_profile():
     })
 
 # SIGNUP ROUTES
-@app.route('/api/signup', methods=['POST'])
+@api.route('/api/signup', methods=['POST'])
 def api_signup():
     form_data = MultiDict(mapping=request.get_json())
     form = SignupForm(formdata=form_data)
@@ -108,7 +193,7 @@ def api_signup():
         }), 500
 
 # LOGIN ROUTES
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def api_login():
     data = request.get_json()
 
@@ -138,7 +223,7 @@ def api_login():
         return jsonify({'success': False, 'message': 'Invalid username or password'}), 401
 
 # CHANGE PASSWORD ROUTES
-@app.route('/api/change_password', methods=['POST'])
+@api.route('/api/change_password', methods=['POST'])
 @login_required
 def api_change_password():
     data = request.get_json()
@@ -156,60 +241,141 @@ def api_change_password():
     try:
         user.set_password(new_password)
         db.session.commit()
+        invalidate_user(user.id)
         return jsonify({'success': True, 'message': 'Password successfully updated.'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': 'Error updating password.', 'error': str(e)}), 500
 
 # AIR POLLUTION PAGE ROUTES
-@app.route('/api/air_pollution', methods=['POST'])
+@api.route('/api/air_pollution', methods=['POST'])
 def air_pollution():
     request_data = request.get_json()
     if not request_data or 'latitude' not in request_data or 'longitude' not in request_data:
         return jsonify({"error": "Missing required fields: latitude, longitude"}), 400
+    if request_data.get('approximate') not in (None, *APPROXIMATIONS):
+        return jsonify({"error": f"approximate must be one of: {', '.join(APPROXIMATIONS)}"}), 400
+    try:
+        response_format, fields = parse_options(request_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
-        data = get_air_pollution_data(request_data)
-        if not data or data.get('air_pollution_data') is None:
-            return jsonify({"error": "Unable to fetch air pollution data. Please try again later."}), 400
-
-        air_pollution_data = data.get('air_pollution_data', {})
-        recommendations = data.get('recommendations', 'No recommendations available.')
-        suggestions = data.get('suggestions', 'No suggestions available.')
-        weekly_forecast = data.get('weekly_forecast', [])
-        hourly_data = data.get('hourly_data', [])
-        hourly_pm25 = data.get('hourly_pm25', [])
-        hourly_pm10 = data.get('hourly_pm10', [])
-        selected_time = data.get('selected_time', None)
-        selected_aqi = data.get('selected_aqi', None)
-        daily_data = data.get('daily_data', [])
-        selected_date = data.get('selected_date', None)
-
-        for entry in daily_data:
-            if 'date' in entry and isinstance(entry['date'], datetime):
-                entry['date'] = entry['date'].strftime('%Y-%m-%d')
-
-        response_data = {
-            "air_pollution_data": air_pollution_data,
-            "recommendations": recommendations,
-            "suggestions": suggestions,
-            "weekly_forecast": weekly_forecast,
-            "hourly_data": hourly_data,
-            "hourly_pm25": hourly_pm25,
-            "hourly_pm10": hourly_pm10,
-            "selected_time": selected_time,
-            "selected_aqi": selected_aqi,
-            "daily_data": daily_data,
-            "selected_date": selected_date
-        }
-
-        return jsonify(response_data), 200
+        return air_pollution_response(get_air_pollution_data(request_data), response_format, fields)
+    except UpstreamUnavailable as e:
+        return upstream_unavailable(e)
     except Exception as e:
         return jsonify({"error": f"Failed to fetch air pollution data: {str(e)}"}), 500
+
+def upstream_unavailable(e):
+    # 429 when our own budget for the upstream is used up, 503 when the provider is
+    # throttling us; either way the client is told when to try again
+    response = jsonify({'error': str(e), 'upstream': e.upstream, 'retry_after': math.ceil(e.retry_after)})
+    response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+    return response, e.status
+
+def air_pollution_response(data, response_format='full', fields=None):
+    # response_format='compact' replaces the per-hour dicts with columns on one time
+    # axis (see payload.compact_air_pollution); fields limits the response to the named keys
+    if not data or data.get('air_pollution_data') is None:
+        return jsonify({"error": "Unable to fetch air pollution data. Please try again later."}), 400
+
+    air_pollution_data = data.get('air_pollution_data', {})
+    recommendations = data.get('recommendations', 'No recommendations available.')
+    suggestions = data.get('suggestions', 'No suggestions available.')
+    weekly_forecast = data.get('weekly_forecast', [])
+    hourly_data = data.get('hourly_data', [])
+    hourly_pm25 = data.get('hourly_pm25', [])
+    hourly_pm10 = data.get('hourly_pm10', [])
+    selected_time = data.get('selected_time', None)
+    selected_aqi = data.get('selected_aqi', None)
+    daily_data = data.get('daily_data', [])
+    selected_date = data.get('selected_date', None)
+    approximated = data.get('approximated', False)
+    stale = data.get('stale', False)
+
+    for entry in daily_data:
+        if 'date' in entry and isinstance(entry['date'], datetime):
+            entry['date'] = entry['date'].strftime('%Y-%m-%d')
+
+    response_data = {
+        "air_pollution_data": air_pollution_data,
+        "recommendations": recommendations,
+        "suggestions": suggestions,
+        "weekly_forecast": weekly_forecast,
+        "hourly_data": hourly_data,
+        "hourly_pm25": hourly_pm25,
+        "hourly_pm10": hourly_pm10,
+        "selected_time": selected_time,
+        "selected_aqi": selected_aqi,
+        "daily_data": daily_data,
+        "selected_date": selected_date,
+        "approximated": approximated,
+        "stale": stale
+    }
+    if approximated:
+        response_data["approximation"] = data['approximation']
+    if stale:
+        response_data["stale_age_seconds"] = data['stale_age_seconds']
+
+    with stage_seconds.time(stage='serialize'):
+        if response_format == 'compact':
+            response_data = compact_air_pollution(response_data)
+        response = jsonify(select_fields(response_data, fields))
+    return response, 200
     
+@api.route('/api/air_pollution/batch', methods=['POST'])
+def air_pollution_batch():
+    request_data = request.get_json(silent=True) or {}
+    locations = request_data.get('locations')
+    if not isinstance(locations, list) or not locations:
+        return jsonify({"error": "Missing required field: locations"}), 400
+    if len(locations) > Config.AIR_BATCH_MAX_LOCATIONS:
+        return jsonify({"error": f"At most {Config.AIR_BATCH_MAX_LOCATIONS} locations per request"}), 400
+
+    try:
+        return jsonify({"results": get_air_pollution_batch(locations)}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch air pollution data: {str(e)}"}), 500
+
+@api.route('/api/air_pollution/history', methods=['GET'])
+def air_pollution_history():
+    # Locally stored readings for the grid cell around a location, downsampled to
+    # hourly or daily buckets
+    try:
+        latitude = float(request.args['latitude'])
+        longitude = float(request.args['longitude'])
+        days = min(max(int(request.args.get('days', 30)), 1), Config.READINGS_MAX_DAYS)
+    except (KeyError, ValueError):
+        return jsonify({"error": "latitude and longitude are required, days must be a number"}), 400
+
+    resolution = request.args.get('resolution', 'hourly')
+    if resolution not in RESOLUTIONS:
+        return jsonify({"error": f"resolution must be one of: {', '.join(RESOLUTIONS)}"}), 400
+
+    cell = grid_key(latitude, longitude, Config.AIR_CACHE_CELL_DEG)
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return jsonify({
+        'resolution': resolution,
+        'days': days,
+        'series': reading_trend(cell, since, resolution)
+    }), 200
+
+# RANKING ROUTES
+@api.route('/api/rankings', methods=['GET'])
+def rankings_api():
+    # Never waits for the first refresh: a cold start answers 503 with a retry hint
+    # instead of holding a worker
+    rankings = ranking_service.payload(timeout=0)
+    if rankings is None:
+        response = jsonify({'error': 'Rankings are not available yet. Please try again shortly.'})
+        response.headers['Retry-After'] = str(Config.RANKINGS_RETRY_AFTER)
+        return response, 503
+    return Response(rankings, mimetype='application/json')
+
 # chatbot 
 
-@app.route('/check-auth', methods=['GET'])
+@api.route('/check-auth', methods=['GET'])
 @login_required
 def check_auth():
     return jsonify({'message': 'Authenticated'}), 200
@@ -223,7 +389,66 @@ def format_response(text):
 def sanitize_title(title):
     return re.sub(r'[\*\_]', '', title).strip()
 
-@app.route('/api/chatbot', methods=['POST'])
+def generate_title(user_input):
+    title_prompt = (
+        "Generate a concise and meaningful title for a conversation that reflects the full context of the interaction. "
+        f"Include user input.\n\nUser: {user_input}"
+    )
+    with gemini_timer('title'):
+        title_response = model.start_chat(history=[]).send_message(title_prompt).text.strip()
+    title_response = sanitize_title(title_response)
+    if len(title_response) > 100:
+        title_response = title_response[:100] + "..."
+    return title_response
+
+def placeholder_title(user_input, length=60):
+    title = sanitize_title(' '.join(user_input.split()))
+    return title if len(title) <= length else title[:length].rstrip() + "..."
+
+def save_chat(user_id, user_input, formatted_response, conversation):
+    # The real title comes from Gemini in the background; until then the row
+    # carries a cheap truncation of the user's message
+    if conversation.id is None:
+        db.session.add(conversation)
+        db.session.flush()
+    chat_history = ChatHistory(
+        user_id=user_id,
+        user_input=user_input,
+        bot_response=formatted_response,
+        title=placeholder_title(user_input),
+        conversation_id=conversation.id
+    )
+    db.session.add(chat_history)
+    db.session.flush()
+    schedule_summary(conversation)
+    job_queue.submit('chat_title', {'chat_id': chat_history.id, 'placeholder': chat_history.title})
+    # The turn, its title job and any summary job are committed together
+    db.session.commit()
+    return chat_history
+
+@job_queue.register('chat_title')
+def fill_chat_title(payload):
+    chat = db.session.get(ChatHistory, payload['chat_id'])
+    if chat is None:
+        return  # deleted before the title was ready
+
+    title = generate_title(chat.user_input)
+    # Keep a title the user edited in the meantime
+    if chat.title == payload['placeholder']:
+        chat.title = title
+        db.session.commit()
+
+def load_conversation(data):
+    # Continue the conversation named in the request, or start a new one
+    try:
+        return get_or_create_conversation(current_user.id, data.get('conversation_id'))
+    except (TypeError, ValueError):
+        return None
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api.route('/api/chatbot', methods=['POST'])
 @login_required
 def chatbot_api():
     data = request.get_json()
@@ -232,39 +457,78 @@ def chatbot_api():
     if not user_input:
         return jsonify({'error': 'No message provided'}), 400
 
+    conversation = load_conversation(data)
+    if conversation is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+
     try:
-        # Step 1: Chatbot interaction
-        chat_session = model.start_chat(history=[])
-        response = chat_session.send_message(user_input)
+        # Step 1: Chatbot interaction, with the summary and recent turns as context
+        chat_session = model.start_chat(history=build_context(conversation))
+        with gemini_timer('chat'):
+            response = chat_session.send_message(user_input)
         bot_response = response.text.strip()
         formatted_response = format_response(bot_response)
 
-        # Step 2: Title generation
-        title_prompt = (
-            "Generate a concise and meaningful title for a conversation that reflects the full context of the interaction. "
-            f"Include user input.\n\nUser: {user_input}"
-        )
-        title_response = model.start_chat(history=[]).send_message(title_prompt).text.strip()
-        title_response = sanitize_title(title_response)
-        if len(title_response) > 100:
-            title_response = title_response[:100] + "..."
-
-        # Step 3: Save chat to database
-        chat_history = ChatHistory(
-            user_id=current_user.id,
-            user_input=user_input,
-            bot_response=formatted_response,
-            title=title_response
-        )
-        db.session.add(chat_history)
-        db.session.commit()
+        # Step 2: Save chat to database with a placeholder title
+        save_chat(current_user.id, user_input, formatted_response, conversation)
 
-        # Step 4: Return response
-        return jsonify({'response': formatted_response})
+        # Step 3: Return response
+        return jsonify({'response': formatted_response, 'conversation_id': conversation.id})
 
+    except UpstreamUnavailable as e:
+        return upstream_unavailable(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/api/chatbot/stream', methods=['POST'])
+@login_required
+def chatbot_stream_api():
+    # Same as /api/chatbot, but tokens are forwarded as Server-Sent Events while Gemini
+    # generates them. The formatted response is sent (and saved) once the stream completes.
+    data = request.get_json()
+    user_input = data.get('message')
+
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+
+    conversation = load_conversation(data)
+    if conversation is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+
+    user_id = current_user.id
+    history = build_context(conversation)
+
+    def generate():
+        try:
+            chunks = []
+            chat_session = model.start_chat(history=history)
+            with gemini_timer('chat_stream'):
+                for chunk in chat_session.send_message(user_input, stream=True):
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield sse_event('token', {'text': chunk.text})
+
+            formatted_response = format_response(''.join(chunks).strip())
+            chat_history = save_chat(user_id, user_input, formatted_response, conversation)
+
+            yield sse_event('done', {
+                'response': formatted_response,
+                'id': chat_history.id,
+                'conversation_id': conversation.id
+            })
+
+        except UpstreamUnavailable as e:
+            yield sse_event('error', {'error': str(e), 'status': e.status, 'retry_after': math.ceil(e.retry_after)})
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # chat history
 
 import logging 
@@ -272,39 +536,113 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-@app.route('/api/history', methods=['GET'])
+def encode_cursor(chat):
+    raw = f"{chat.timestamp.isoformat()}|{chat.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    timestamp, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(timestamp), int(chat_id)
+
+@api.route('/api/history', methods=['GET'])
 @login_required
 def chat_history_api():
+    # Keyset-paginated, newest first. ?view=summary returns only id/title/timestamp;
+    # pass the returned next_cursor back as ?cursor= to get the following page.
+    # Covers the last 7 days plus turns restored from the archive in that time, which
+    # keep their original timestamp and so are listed after the recent ones.
+    try:
+        limit = min(max(int(request.args.get('limit', Config.HISTORY_PAGE_SIZE)), 1), Config.HISTORY_MAX_PAGE_SIZE)
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    summary = request.args.get('view') == 'summary'
+
     try:
         logger.debug(f"Fetching history for user_id: {current_user.id}")
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
 
-        history = ChatHistory.query.filter(
+        query = ChatHistory.query.filter(
             ChatHistory.user_id == current_user.id,
-            ChatHistory.timestamp >= seven_days_ago
-        ).order_by(ChatHistory.timestamp.desc()).all()
-
-        history_data = [
-            {
-                'id': chat.id,
-                'title': chat.title or None,  # Handle None explicitly
-                'user_input': chat.user_input,
-                'bot_response': str(chat.bot_response),  # Ensure string conversion
-                'timestamp': chat.timestamp.isoformat()
-            }
-            for chat in history
-        ]
+            db.or_(ChatHistory.timestamp >= seven_days_ago, ChatHistory.restored_at >= seven_days_ago)
+        )
+        if cursor:
+            cursor_timestamp, cursor_id = cursor
+            query = query.filter(db.or_(
+                ChatHistory.timestamp < cursor_timestamp,
+                db.and_(ChatHistory.timestamp == cursor_timestamp, ChatHistory.id < cursor_id)
+            ))
+        if summary:
+            query = query.with_entities(ChatHistory.id, ChatHistory.title, ChatHistory.timestamp)
+
+        history = query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1).all()
+        next_cursor = encode_cursor(history[limit - 1]) if len(history) > limit else None
+        history = history[:limit]
+
+        if summary:
+            history_data = [
+                {'id': chat.id, 'title': chat.title or None, 'timestamp': chat.timestamp.isoformat()}
+                for chat in history
+            ]
+        else:
+            history_data = [
+                {
+                    'id': chat.id,
+                    'title': chat.title or None,  # Handle None explicitly
+                    'user_input': chat.user_input,
+                    'bot_response': str(chat.bot_response),  # Ensure string conversion
+                    'timestamp': chat.timestamp.isoformat()
+                }
+                for chat in history
+            ]
 
         logger.debug(f"Returning {len(history_data)} chat entries")
-        return jsonify({'history': history_data}), 200
+        return jsonify({'history': history_data, 'next_cursor': next_cursor}), 200
 
     except Exception as e:
         logger.error(f"Error in chat_history_api: {str(e)}")
         return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+@api.route('/api/history/archive', methods=['GET'])
+@login_required
+def chat_archive_api():
+    # Months of chat history that have been moved out of the table for this user
+    return jsonify({'months': archive_months(current_user.id)}), 200
+
+@api.route('/api/history/archive/restore', methods=['POST'])
+@login_required
+def restore_chat_archive_api():
+    data = request.get_json(silent=True) or {}
+    month = data.get('month')
+    if month is not None and not re.fullmatch(r'\d{4}-\d{2}', str(month)):
+        return jsonify({'error': 'month must look like YYYY-MM'}), 400
+    if month is not None and month not in archive_months(current_user.id):
+        return jsonify({'error': 'No archive for that month'}), 404
+
+    job_id = job_queue.submit('chat_restore', {'user_id': current_user.id, 'month': month})
+    db.session.commit()
+    return jsonify({'message': 'Restore started', 'job_id': job_id}), 202
+
+@api.route('/api/history/search', methods=['GET'])
+@login_required
+def chat_search_api():
+    # Ranked matches over the user's whole history (titles, questions and answers),
+    # each with a short snippet around the matched words
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', Config.HISTORY_PAGE_SIZE)), 1), Config.HISTORY_MAX_PAGE_SIZE)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid limit'}), 400
+
+    with stage_seconds.time(stage='history_search'):
+        results = search_history(current_user.id, text, limit)
+    return jsonify({'results': results}), 200
+
 # chat Detail
 
-@app.route('/api/history/<int:chat_id>', methods=['GET'])
+@api.route('/api/history/<int:chat_id>', methods=['GET'])
 @login_required
 def get_chat_detail(chat_id):
     chat = ChatHistory.query.get_or_404(chat_id)
@@ -322,7 +660,7 @@ def get_chat_detail(chat_id):
 
 # update chat title
 
-@app.route('/api/history/<int:chat_id>', methods=['PUT'])
+@api.route('/api/history/<int:chat_id>', methods=['PUT'])
 @login_required
 def update_chat_title(chat_id):
     chat = ChatHistory.query.get_or_404(chat_id)
@@ -344,7 +682,7 @@ def update_chat_title(chat_id):
 
 # delete Chat 
 
-@app.route('/api/history/<int:chat_id>', methods=['DELETE'])
+@api.route('/api/history/<int:chat_id>', methods=['DELETE'])
 @login_required
 def delete_chat_api(chat_id):
     chat = ChatHistory.query.get_or_404(chat_id)
@@ -359,4 +697,5 @@ def delete_chat_api(chat_id):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # With the reloader this module runs twice; only the serving child starts the services
+    create_app(start_background=os.environ.get('WERKZEUG_RUN_MAIN') == 'true').run(debug=True, port=5000)
\ No newline at end of file
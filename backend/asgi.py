@@ -0,0 +1,194 @@
+# ASGI entry point: `uvicorn asgi:application --workers 4` (run from backend/).
+# The I/O-bound endpoints (air pollution lookups and chatbot replies) are served by
+# native coroutines, so a slow OpenWeather or Gemini call no longer holds a worker
+# thread. Every other route runs through the regular Flask app on a thread pool.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import sys
+from flask import jsonify, request
+from flask_login import current_user
+from app import (create_app, login_manager, model, air_pollution_response, load_conversation,
+                 format_response, save_chat, upstream_unavailable)
+from air_pollution import APPROXIMATIONS, get_air_pollution_data_async
+from conversation import build_context
+from payload import parse_options
+from throttle import UpstreamUnavailable
+from upstream import async_upstream
+from metrics import gemini_timer
+from config import Config
+
+app = create_app(start_background=True)
+wsgi_executor = ThreadPoolExecutor(max_workers=Config.ASGI_SYNC_WORKERS, thread_name_prefix='asgi-wsgi')
+
+# === Native async handlers ===
+
+async def air_pollution():
+    request_data = request.get_json(silent=True)
+    if not request_data or 'latitude' not in request_data or 'longitude' not in request_data:
+        return jsonify({"error": "Missing required fields: latitude, longitude"}), 400
+    if request_data.get('approximate') not in (None, *APPROXIMATIONS):
+        return jsonify({"error": f"approximate must be one of: {', '.join(APPROXIMATIONS)}"}), 400
+    try:
+        response_format, fields = parse_options(request_data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return air_pollution_response(await get_air_pollution_data_async(request_data), response_format, fields)
+    except UpstreamUnavailable as e:
+        return upstream_unavailable(e)
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch air pollution data: {str(e)}"}), 500
+
+async def chatbot():
+    if not current_user.is_authenticated:
+        return login_manager.unauthorized()
+
+    data = request.get_json(silent=True) or {}
+    user_input = data.get('message')
+
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+
+    # Database work stays synchronous and runs off the event loop
+    conversation = await asyncio.to_thread(load_conversation, data)
+    if conversation is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+
+    try:
+        history = await asyncio.to_thread(build_context, conversation)
+        with gemini_timer('chat'):
+            response = await model.start_chat(history=history).send_message_async(user_input)
+        formatted_response = format_response(response.text.strip())
+
+        await asyncio.to_thread(save_chat, current_user.id, user_input, formatted_response, conversation)
+        return jsonify({'response': formatted_response, 'conversation_id': conversation.id})
+
+    except UpstreamUnavailable as e:
+        return upstream_unavailable(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+ASYNC_ROUTES = {
+    ('POST', '/api/air_pollution'): air_pollution,
+    ('POST', '/api/chatbot'): chatbot,
+}
+
+# === ASGI plumbing ===
+
+def build_environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def run_handler(handler, scope, receive, send):
+    environ = build_environ(scope, await read_body(receive))
+    ctx = app.request_context(environ)
+    ctx.push()
+    try:
+        # Same response pipeline as a Flask view: CORS headers, session cookie, teardown
+        response = app.preprocess_request()
+        if response is None:
+            response = await handler()
+        response = app.process_response(app.make_response(response))
+        status, headers, body = response.status_code, response.headers.to_wsgi_list(), response.get_data()
+    except Exception as e:
+        app.logger.exception(e)
+        status, headers, body = 500, [('Content-Type', 'text/plain')], b'Internal Server Error'
+    finally:
+        ctx.pop()
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def run_wsgi(scope, receive, send):
+    # The whole WSGI call runs on one pool thread (Flask's context stays on that thread);
+    # chunks are handed back as they are produced so /api/chatbot/stream keeps streaming
+    environ = build_environ(scope, await read_body(receive))
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+
+    def start_response(status, headers, exc_info=None):
+        loop.call_soon_threadsafe(messages.put_nowait, ('start', int(status.split(' ', 1)[0]), headers))
+
+    def run():
+        try:
+            iterable = app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if chunk:
+                        loop.call_soon_threadsafe(messages.put_nowait, ('body', chunk))
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            loop.call_soon_threadsafe(messages.put_nowait, ('end',))
+
+    worker = loop.run_in_executor(wsgi_executor, run)
+    while True:
+        message = await messages.get()
+        if message[0] == 'start':
+            await send({
+                'type': 'http.response.start',
+                'status': message[1],
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in message[2]],
+            })
+        elif message[0] == 'body':
+            await send({'type': 'http.response.body', 'body': message[1], 'more_body': True})
+        else:
+            break
+    await worker
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_upstream.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler = ASYNC_ROUTES.get((scope.get('method'), scope.get('path')))
+    if handler is None:
+        return await run_wsgi(scope, receive, send)
+    await run_handler(handler, scope, receive, send)
@@ -0,0 +1,87 @@
+# Spike benchmark: a burst of concurrent /api/air_pollution requests over a few grid
+# cells with a cold cache, against a fake OpenWeather, counting upstream calls.
+#   before:    every request that misses the cache makes its own upstream calls
+#   coalesced: concurrent misses for a cell share one call (single-flight)
+#   budgeted:  coalesced, plus the OpenWeather token bucket at the configured rate
+# Run from backend/: python -m benchmarks.bench_coalescing [clients] [cells] [openweather_latency]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = {
+    'before': {'OPENWEATHER_RATE_PER_MIN': '0'},
+    'coalesced': {'OPENWEATHER_RATE_PER_MIN': '0'},
+    'budgeted': {},
+}
+
+CHILD = r'''
+import collections, json, os, sys, threading, time
+clients, cells, latency, mode = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]), sys.argv[4]
+from benchmarks.fakes import FakeGemini, FakeOpenWeather
+openweather = FakeOpenWeather(latency=latency).start()
+os.environ['OPENWEATHER_BASE_URL'] = openweather.base_url
+
+import gemini_config
+gemini_config.model = FakeGemini(latency=0)
+from throttle import SingleFlight
+if mode == 'before':
+    SingleFlight.do = lambda self, key, func, *args: func(*args)
+from app import create_app
+from config import Config
+
+app = create_app(start_background=False)
+barrier = threading.Barrier(clients)
+statuses = collections.Counter()
+latencies = []
+lock = threading.Lock()
+
+def client(index):
+    # a few hundred metres apart inside the cell, so the exact URLs differ
+    cell = index % cells
+    body = {'latitude': 31.5 + cell * 0.05 + (index % 7) * 0.0005, 'longitude': 74.3 + (index % 5) * 0.0005}
+    test_client = app.test_client()
+    barrier.wait()
+    start = time.perf_counter()
+    status = test_client.post('/api/air_pollution', json=body).status_code
+    with lock:
+        statuses[status] += 1
+        latencies.append(time.perf_counter() - start)
+
+threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+latencies.sort()
+print(json.dumps({
+    'upstream_calls': openweather.calls,
+    'statuses': dict(statuses),
+    'p50_ms': latencies[len(latencies) // 2] * 1000,
+    'max_ms': latencies[-1] * 1000,
+    'rate_per_min': Config.OPENWEATHER_RATE_PER_MIN,
+}))
+'''
+
+def run(mode, clients, cells, latency):
+    env = dict(os.environ, ADVICE_PREWARM='false', RANKINGS_ENABLED='false', METRICS_ENABLED='false',
+               OPENWEATHER_API_KEY='bench', AIR_FETCH_WORKERS=str(clients * 2),
+               DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}", **MODES[mode])
+    output = subprocess.run([sys.executable, '-c', CHILD, str(clients), str(cells), str(latency), mode],
+                            capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cells = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+    print(f"{clients} concurrent requests over {cells} grid cells, OpenWeather latency {latency} s")
+    for mode in MODES:
+        result = run(mode, clients, cells, latency)
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['statuses'].items()))
+        print(f"{mode:>9}: {result['upstream_calls']:4d} upstream calls  p50 {result['p50_ms']:7.1f} ms  "
+              f"max {result['max_ms']:7.1f} ms  statuses {{{statuses}}}")
+
+if __name__ == '__main__':
+    main()
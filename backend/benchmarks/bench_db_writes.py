@@ -0,0 +1,124 @@
+# Write-concurrency benchmark: parallel chat saves (Conversation + ChatHistory inserts
+# through save_chat, with a simulated Gemini call in between) alongside history readers,
+# against a fresh SQLite file.
+#   before: rollback journal, 5 s busy timeout, and the new conversation flushed before
+#           the Gemini call, holding the write lock for its whole duration (the old flow)
+#   wal:    the old flow with WAL, synchronous=NORMAL and the configured busy timeout
+#   after:  WAL settings, and the conversation inserted together with its first turn
+# Run from backend/: python -m benchmarks.bench_db_writes [writers] [saves_per_writer] [readers] [llm_seconds]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = {
+    'before': ({'SQLITE_WAL': 'false', 'SQLITE_BUSY_TIMEOUT': '5'}, 'early'),  # sqlite3.connect() defaults
+    'wal': ({}, 'early'),
+    'after': ({}, 'deferred'),
+}
+
+CHILD = r'''
+import json, sys, threading, time
+from sqlalchemy.exc import OperationalError
+
+writers, saves, readers = map(int, sys.argv[1:4])
+llm_seconds, flush = float(sys.argv[4]), sys.argv[5]
+from app import create_app, save_chat
+from models import db, User, ChatHistory
+from conversation import get_or_create_conversation
+
+app = create_app(start_background=False)
+with app.app_context():
+    db.create_all()
+    journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+    for index in range(writers):
+        db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password='x'))
+    db.session.commit()
+
+latencies, errors, reads = [], [], [0]
+lock = threading.Lock()
+done = threading.Event()
+
+def writer(user_id):
+    with app.app_context():
+        for index in range(saves):
+            start = time.perf_counter()
+            try:
+                conversation = get_or_create_conversation(user_id)
+                if flush == 'early':
+                    db.session.add(conversation)
+                    db.session.flush()
+                time.sleep(llm_seconds)  # waiting on Gemini
+                save_chat(user_id, f'message {index}', f'response {index}', conversation)
+                db.session.commit()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except OperationalError as e:
+                db.session.rollback()
+                with lock:
+                    errors.append(str(e.orig))
+
+def reader():
+    with app.app_context():
+        while not done.is_set():
+            try:
+                ChatHistory.query.order_by(ChatHistory.timestamp.desc()).limit(20).all()
+                db.session.commit()
+                with lock:
+                    reads[0] += 1
+            except OperationalError as e:
+                db.session.rollback()
+                with lock:
+                    errors.append(str(e.orig))
+
+reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+writer_threads = [threading.Thread(target=writer, args=(index + 1,)) for index in range(writers)]
+started = time.perf_counter()
+for thread in reader_threads + writer_threads:
+    thread.start()
+for thread in writer_threads:
+    thread.join()
+elapsed = time.perf_counter() - started
+done.set()
+for thread in reader_threads:
+    thread.join()
+
+latencies.sort()
+print(json.dumps({
+    'journal_mode': journal_mode,
+    'saves': len(latencies),
+    'errors': len(errors),
+    'locked_errors': sum('locked' in error for error in errors),
+    'saves_per_s': len(latencies) / elapsed,
+    'reads_per_s': reads[0] / elapsed,
+    'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+    'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+}))
+'''
+
+def run(mode, writers, saves, readers, llm_seconds):
+    settings, flush = MODES[mode]
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, ADVICE_PREWARM='false', RANKINGS_ENABLED='false', METRICS_ENABLED='false',
+               DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}", **settings)
+    args = [str(writers), str(saves), str(readers), str(llm_seconds), flush]
+    output = subprocess.run([sys.executable, '-c', CHILD, *args],
+                            capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    llm_seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+    print(f"{writers} writers x {saves} chat saves, {readers} history readers, {llm_seconds} s per Gemini call")
+    for mode in MODES:
+        result = run(mode, writers, saves, readers, llm_seconds)
+        print(f"{mode:>6} ({result['journal_mode']:>6}): {result['saves_per_s']:7.1f} saves/s  "
+              f"{result['reads_per_s']:7.1f} reads/s  p50 {result['p50_ms'] or 0:7.1f} ms  "
+              f"p99 {result['p99_ms'] or 0:7.1f} ms  errors {result['errors']} "
+              f"(database is locked: {result['locked_errors']})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Micro-benchmark: columnar forecast transform vs the previous three-pass loops.
+# Run from backend/: python -m benchmarks.bench_forecast [hours] [repeat]
+from datetime import datetime
+import random
+import sys
+import timeit
+from forecast import transform_forecast
+
+def legacy_forecast(forecast_data):
+    # The three-pass loop transform that transform_forecast replaced
+    weekly_forecast = []
+    hourly_data = []
+    hourly_pm25 = []
+    hourly_pm10 = []
+    daily_data = []
+
+    current_date = None
+    forecast_group = None
+
+    for forecast in forecast_data['list']:
+        forecast_timestamp = forecast['dt']
+        forecast_date = datetime.fromtimestamp(forecast_timestamp).strftime('%d %b %Y')
+        forecast_day = datetime.fromtimestamp(forecast_timestamp).strftime('%A')
+
+        if forecast_date != current_date:
+            if forecast_group:
+                weekly_forecast.append(forecast_group)
+            forecast_group = {
+                'day': forecast_day,
+                'date': forecast_date,
+                'aqi': forecast['main']['aqi'],
+                'co': forecast['components']['co'],
+                'pm2_5': forecast['components']['pm2_5'],
+                'forecasts': []
+            }
+            current_date = forecast_date
+
+        forecast_item = {
+            'aqi': forecast['main']['aqi'],
+            'co': forecast['components']['co'],
+            'pm2_5': forecast['components']['pm2_5'],
+        }
+        forecast_group['forecasts'].append(forecast_item)
+
+    if forecast_group:
+        weekly_forecast.append(forecast_group)
+
+    # === Hourly Data ===
+    for data in forecast_data['list']:
+        time_str = datetime.fromtimestamp(data['dt']).strftime('%H:%M:%S')
+        hourly_data.append({'time': time_str, 'value': data['main']['aqi']})
+        hourly_pm25.append({'time': time_str, 'value': data['components']['pm2_5']})
+        hourly_pm10.append({'time': time_str, 'value': data['components']['pm10']})
+
+    # === Daily Aggregation ===
+    seen_dates = set()
+    for forecast in forecast_data['list']:
+        forecast_date = datetime.fromtimestamp(forecast['dt']).strftime('%Y-%m-%d')
+        if forecast_date not in seen_dates:
+            seen_dates.add(forecast_date)
+            daily_data.append({
+                'date': forecast_date,
+                'aqi': forecast['main']['aqi'],
+                'pm2_5': forecast['components'].get('pm2_5', 0),
+                'pm10': forecast['components'].get('pm10', 0),
+                'co': forecast['components'].get('co', 0),
+                'o3': forecast['components'].get('o3', 0),
+                'so2': forecast['components'].get('so2', 0),
+            })
+
+    return {
+        'weekly_forecast': weekly_forecast,
+        'hourly_data': hourly_data,
+        'hourly_pm25': hourly_pm25,
+        'hourly_pm10': hourly_pm10,
+        'daily_data': daily_data,
+    }
+
+def empty_forecast():
+    return {
+        'weekly_forecast': [],
+        'hourly_data': [],
+        'hourly_pm25': [],
+        'hourly_pm10': [],
+        'daily_data': [],
+    }
+
+def synthetic_forecast(hours, start=1700000000):
+    random.seed(42)
+    return {'list': [
+        {
+            'dt': start + 3600 * i,
+            'main': {'aqi': random.randint(1, 5)},
+            'components': {
+                name: round(random.uniform(0, 300), 2)
+                for name in ('co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3')
+            },
+        }
+        for i in range(hours)
+    ]}
+
+def main():
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 96  # OpenWeather returns ~4 days of hourly data
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    payload = synthetic_forecast(hours)
+
+    old, new = legacy_forecast(payload), transform_forecast(payload)
+    for key in ('weekly_forecast', 'hourly_data', 'hourly_pm25', 'hourly_pm10'):
+        assert old[key] == new[key], f"{key} differs from the loop implementation"
+    assert [day['date'] for day in old['daily_data']] == [day['date'] for day in new['daily_data']]
+
+    for name, func in (('loops', legacy_forecast), ('columnar', transform_forecast)):
+        best = min(timeit.repeat(lambda: func(payload), number=repeat, repeat=5)) / repeat
+        print(f"{name:>9}: {best * 1e6:8.1f} us per forecast ({hours} hours)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Outage benchmark: /api/air_pollution latency while OpenWeather is slow and failing,
+# for a few grid cells whose cached data has just expired, against a fake OpenWeather.
+#   before:  no stale window and no circuit breaker: every request waits on the upstream
+#   after:   expired data is served at once (stale-while-revalidate) and the breaker
+#            stops calling the failing upstream
+# Run from backend/: python -m benchmarks.bench_outage [requests] [cells] [openweather_latency]
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = {
+    'before': {'AIR_CACHE_STALE_TTL': '0', 'CIRCUIT_FAILURE_THRESHOLD': '1000000'},
+    'after': {},
+}
+
+CHILD = r'''
+import json, os, sys, time
+requests, cells, latency = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])
+from benchmarks.fakes import FakeGemini, FakeOpenWeather
+openweather = FakeOpenWeather(latency=0).start()
+os.environ['OPENWEATHER_BASE_URL'] = openweather.base_url
+
+import gemini_config
+gemini_config.model = FakeGemini(latency=0)
+import air_pollution
+from app import create_app
+
+app = create_app(start_background=False)
+test_client = app.test_client()
+bodies = [{'latitude': 31.5 + cell * 0.05, 'longitude': 74.3} for cell in range(cells)]
+for body in bodies:
+    test_client.post('/api/air_pollution', json=body)
+
+# Every cached entry expires and the upstream turns slow and unreliable
+for cache in (air_pollution.current_cache, air_pollution.forecast_cache):
+    for key in list(cache._data):
+        expires_at, value, stored_at = cache._data[key]
+        cache._data[key] = (time.monotonic(), value, stored_at)
+openweather.latency, openweather.failure_rate = latency, 0.8
+calls_before = openweather.calls
+
+statuses, stale, latencies = {}, 0, []
+for index in range(requests):
+    start = time.perf_counter()
+    response = test_client.post('/api/air_pollution', json=bodies[index % cells])
+    latencies.append(time.perf_counter() - start)
+    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    stale += bool(response.get_json().get('stale'))
+latencies.sort()
+print(json.dumps({
+    'upstream_calls': openweather.calls - calls_before,
+    'statuses': statuses,
+    'stale': stale,
+    'p50_ms': latencies[len(latencies) // 2] * 1000,
+    'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000,
+}))
+'''
+
+def run(mode, requests, cells, latency):
+    env = dict(os.environ, ADVICE_PREWARM='false', RANKINGS_ENABLED='false', METRICS_ENABLED='false',
+               OPENWEATHER_API_KEY='bench', OPENWEATHER_RATE_PER_MIN='0',
+               DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}", **MODES[mode])
+    output = subprocess.run([sys.executable, '-c', CHILD, str(requests), str(cells), str(latency)],
+                            capture_output=True, text=True, env=env, check=True)
+    # background refreshes may still be logging failures after the result line
+    return json.loads([line for line in output.stdout.splitlines() if line.startswith('{')][-1])
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    cells = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    print(f"{requests} requests over {cells} expired grid cells, OpenWeather latency {latency} s, 80% failures")
+    for mode in MODES:
+        result = run(mode, requests, cells, latency)
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['statuses'].items()))
+        print(f"{mode:>6}: {result['upstream_calls']:4d} upstream calls  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  stale {result['stale']:3d}  statuses {{{statuses}}}")
+
+if __name__ == '__main__':
+    main()
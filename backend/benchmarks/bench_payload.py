@@ -0,0 +1,48 @@
+# Payload benchmark for /api/air_pollution: response size of the full and compact
+# formats, raw and gzip/brotli encoded, and encode time with the stdlib and orjson.
+# Run from backend/: python -m benchmarks.bench_payload [hours] [repeat]
+import gzip
+import json
+import sys
+import timeit
+from air_pollution import build_result
+from forecast import transform_forecast
+from payload import compact_air_pollution, orjson
+from benchmarks.bench_forecast import synthetic_forecast
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def sample_response(hours):
+    current = synthetic_forecast(1)
+    return build_result({'city': 'Bench', 'country': 'XX'}, current, 'Recommendations text.',
+                        'Suggestions text.', transform_forecast(synthetic_forecast(hours)))
+
+def main():
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 96
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    full = sample_response(hours)
+    bodies = {'full': full, 'compact': compact_air_pollution(full)}
+
+    print(f"{hours} forecast hours")
+    for name, body in bodies.items():
+        data = json.dumps(body, separators=(',', ':')).encode()
+        sizes = f"raw {len(data):7d} B  gzip {len(gzip.compress(data, compresslevel=6)):6d} B"
+        if brotli is not None:
+            sizes += f"  br {len(brotli.compress(data, quality=5)):6d} B"
+        print(f"{name:>8}: {sizes}")
+
+    encoders = {'json': lambda body: json.dumps(body, separators=(',', ':'), sort_keys=True).encode()}
+    if orjson is not None:
+        encoders['orjson'] = lambda body: orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+    for name, body in bodies.items():
+        for encoder_name, encode in encoders.items():
+            best = min(timeit.repeat(lambda: encode(body), number=repeat, repeat=5)) / repeat
+            print(f"{name:>8} {encoder_name:>6}: {best * 1e6:8.1f} us per response")
+    best = min(timeit.repeat(lambda: compact_air_pollution(full), number=repeat, repeat=5)) / repeat
+    print(f"compact conversion: {best * 1e6:8.1f} us per response")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Spatial index benchmark: radius queries against the bucketed ReadingIndex vs a linear
+# scan of every cached reading, and how many requests spread over a metro area could be
+# answered from readings already fetched nearby instead of going upstream.
+# Run from backend/: python -m benchmarks.bench_spatial [readings] [queries] [radius_km]
+import random
+import sys
+import time
+from cache import grid_key
+from spatial import ReadingIndex, haversine_km
+
+# Roughly the Delhi NCR bounding box
+LAT_RANGE = (28.40, 28.88)
+LON_RANGE = (76.84, 77.35)
+CELL_DEG = 0.01
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    radius_km = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    rng = random.Random(42)
+
+    index = ReadingIndex(radius_km, max_age=3600, max_entries=readings * 2)
+    points = {}
+    for _ in range(readings):
+        latitude, longitude = random_point(rng)
+        key = grid_key(latitude, longitude, CELL_DEG)
+        points[key] = (latitude, longitude)
+        index.add(key, latitude, longitude, None)
+    probes = [random_point(rng) for _ in range(queries)]
+
+    started = time.perf_counter()
+    for latitude, longitude in probes:
+        index.nearby(latitude, longitude, radius_km, limit=1)
+    indexed = (time.perf_counter() - started) / queries
+
+    started = time.perf_counter()
+    for latitude, longitude in probes:
+        min((haversine_km(latitude, longitude, *point), key) for key, point in points.items())
+    linear = (time.perf_counter() - started) / queries
+    print(f"{len(points)} readings, radius {radius_km} km: index {indexed * 1e6:8.1f} us/query, "
+          f"linear scan {linear * 1e6:8.1f} us/query")
+
+    # Requests arriving one by one over an initially empty index: each miss fetches
+    # upstream (two calls, current + forecast) and adds its reading
+    for radius in (0, 1, 2, 5):
+        fresh = ReadingIndex(max(radius, 1), max_age=3600)
+        fetched = set()  # radius 0: only the exact grid cell cache
+        upstream = 0
+        for latitude, longitude in probes:
+            key = grid_key(latitude, longitude, CELL_DEG)
+            if key in fetched or (radius and fresh.nearby(latitude, longitude, radius, limit=1)):
+                continue
+            upstream += 2
+            fetched.add(key)
+            fresh.add(key, latitude, longitude, None)
+        print(f"approximate radius {radius} km: {upstream:6d} upstream calls for {queries} requests")
+
+if __name__ == '__main__':
+    main()
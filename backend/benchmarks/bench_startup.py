@@ -0,0 +1,52 @@
+# Cold-start benchmark: how long a fresh worker process takes to import the backend,
+# build the app and answer its first request, with the Gemini client left lazy (as in
+# production) and created eagerly (the previous import-time behaviour).
+# Run from backend/: python -m benchmarks.bench_startup [runs]
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app(start_background=False)
+created = time.perf_counter()
+if sys.argv[1] == 'eager':
+    import gemini_config
+    gemini_config.get_model()
+ready = time.perf_counter()
+app.test_client().get('/check-auth')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'gemini_ms': (ready - created) * 1000,
+    'first_request_ms': (served - ready) * 1000,
+    'sdk_loaded': 'google.generativeai' in sys.modules,
+}))
+'''
+
+def run_once(mode):
+    env = dict(os.environ, ADVICE_PREWARM='false', RANKINGS_ENABLED='false')
+    spawned = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD, mode], capture_output=True, text=True, env=env, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result['total_ms'] = (time.perf_counter() - spawned) * 1000  # includes interpreter start-up
+    return result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for mode in ('lazy', 'eager'):
+        results = [run_once(mode) for _ in range(runs)]
+        summary = {key: statistics.median(result[key] for result in results)
+                   for key in ('import_ms', 'create_app_ms', 'gemini_ms', 'first_request_ms', 'total_ms')}
+        print(f"{mode:>6}: " + '  '.join(f"{key} {value:7.1f}" for key, value in summary.items())
+              + f"  (sdk loaded: {results[0]['sdk_loaded']}, median of {runs})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# Local stand-ins for the third-party APIs, used by the load tests so they run offline
+# and are not skewed by (or billed for) real OpenWeather and Gemini traffic.
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+POLLUTANTS = ('co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3')
+
+def jittered(latency):
+    # +/-25% around the configured latency so requests don't complete in lockstep
+    return latency * random.uniform(0.75, 1.25) if latency > 0 else 0
+
+def fake_reading(rng, dt):
+    return {
+        'dt': dt,
+        'main': {'aqi': rng.randint(1, 5)},
+        'components': {name: round(rng.uniform(0, 120), 2) for name in POLLUTANTS},
+    }
+
+
+class FakeOpenWeather:
+    # Serves /air_pollution and /air_pollution/forecast in OpenWeather's response shape.
+    # Payloads are seeded by coordinate so repeated lookups for a location agree.
+
+    def __init__(self, latency=0.1, failure_rate=0.0, forecast_hours=96):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.forecast_hours = forecast_hours
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def payload(self, path, query):
+        latitude, longitude = query.get('lat', ['0'])[0], query.get('lon', ['0'])[0]
+        rng = random.Random(f'{latitude},{longitude}')
+        now = int(time.time()) // 3600 * 3600
+        if path.endswith('/forecast'):
+            return {'list': [fake_reading(rng, now + hour * 3600) for hour in range(self.forecast_hours)]}
+        return {'list': [fake_reading(rng, now)]}
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.calls += 1
+                time.sleep(jittered(fake.latency))
+                url = urlsplit(self.path)
+                if random.random() < fake.failure_rate:
+                    self.respond(503, {'cod': 503, 'message': 'fake upstream failure'})
+                elif url.path.endswith(('/air_pollution', '/air_pollution/forecast')):
+                    self.respond(200, fake.payload(url.path, parse_qs(url.query)))
+                else:
+                    self.respond(404, {'cod': 404, 'message': 'not found'})
+
+            def respond(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-openweather', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiChat:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream=False, **kwargs):
+        text = self.model.reply(message)
+        if not stream:
+            self.model.wait()
+            return FakeGeminiResponse(text)
+
+        def chunks():
+            words = text.split(' ')
+            for word in words:
+                time.sleep(jittered(self.model.latency) / len(words))
+                yield FakeGeminiResponse(word + ' ')
+        return chunks()
+
+    async def send_message_async(self, message, **kwargs):
+        text = self.model.reply(message)
+        await asyncio.sleep(jittered(self.model.latency))
+        return FakeGeminiResponse(text)
+
+
+class FakeGemini:
+    # Drop-in for gemini_config.model: same call surface the backend uses, with a fixed
+    # latency per call and an optional failure rate.
+
+    def __init__(self, latency=0.5, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reply(self, message):
+        with self._lock:
+            self.calls += 1
+        if random.random() < self.failure_rate:
+            raise RuntimeError('fake Gemini failure')
+        return (f"**Advice:** keep windows closed while the AQI is high and limit time outdoors. "
+                f"You asked: {str(message)[:60]}")
+
+    def wait(self):
+        time.sleep(jittered(self.latency))
+
+    def generate_content(self, prompt, **kwargs):
+        self.reply(prompt)
+        self.wait()
+        return FakeGeminiResponse(json.dumps({
+            'recommendations': 'Limit prolonged outdoor exertion.',
+            'suggestions': 'Check the forecast before planning outdoor activities.',
+        }))
+
+    def start_chat(self, history=None):
+        return FakeGeminiChat(self, history)
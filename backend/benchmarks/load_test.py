@@ -0,0 +1,194 @@
+# Offline load test: starts the backend against local fake OpenWeather and Gemini
+# upstreams, drives /api/air_pollution, /api/chatbot and /api/history at fixed
+# concurrency levels and writes p50/p95/p99 latency and throughput to a JSON file.
+#
+# Run from backend/:
+#   python -m benchmarks.load_test --concurrency 1,8,32 --requests 200
+#   python -m benchmarks.load_test --server asgi --openweather-latency 0.3 --gemini-failure-rate 0.05
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import requests
+from benchmarks.fakes import FakeGemini, FakeOpenWeather
+
+ENDPOINTS = ('air_pollution', 'chatbot', 'history')
+USER = {'username': 'loadtest', 'email': 'loadtest@example.com',
+        'password': 'loadtest-password', 'confirm_password': 'loadtest-password'}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline load test against fake upstreams')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated client concurrency levels')
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint and level')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--locations', type=int, default=50, help='distinct coordinates used for air pollution lookups')
+    parser.add_argument('--openweather-latency', type=float, default=0.1, help='seconds')
+    parser.add_argument('--openweather-failure-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help='seconds')
+    parser.add_argument('--gemini-failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmarks/load_test_baseline.json')
+    return parser.parse_args()
+
+def load_app(args, openweather, gemini):
+    # Point the backend at the fakes before any of its modules read the configuration
+    os.environ['OPENWEATHER_BASE_URL'] = openweather.base_url
+    os.environ.setdefault('OPENWEATHER_API_KEY', 'load-test')
+    os.environ['RANKINGS_ENABLED'] = 'false'
+    # Measure the server rather than the plan limits (see bench_coalescing for the budgets)
+    os.environ.setdefault('OPENWEATHER_RATE_PER_MIN', '0')
+    os.environ.setdefault('GEMINI_RATE_PER_MIN', '0')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+
+    import gemini_config
+    gemini_config.model = gemini
+
+    from models import db
+    from jobs import job_queue
+    if args.server == 'asgi':
+        from asgi import app  # the ASGI module creates (and owns) its app
+    else:
+        from app import create_app
+        app = create_app(start_background=True)
+    logging.getLogger().setLevel(logging.WARNING)  # app.py enables DEBUG logging
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # one access log line per request
+    app.config['SESSION_COOKIE_SECURE'] = False  # the local server speaks plain HTTP
+    with app.app_context():
+        db.create_all()
+    job_queue.recover()  # the queue started before the tables existed
+    return app
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(kind, app):
+    port = free_port()
+    if kind == 'asgi':
+        import uvicorn
+        import asgi
+        server = uvicorn.Server(uvicorn.Config(asgi.application, host='127.0.0.1', port=port, log_level='warning'))
+        threading.Thread(target=server.run, name='asgi-server', daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        return f'http://127.0.0.1:{port}', lambda: setattr(server, 'should_exit', True)
+
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='wsgi-server', daemon=True).start()
+    return f'http://127.0.0.1:{port}', server.shutdown
+
+def login_sessions(base_url, count):
+    requests.post(f'{base_url}/api/signup', json=USER)
+    sessions = []
+    for _ in range(count):
+        session = requests.Session()
+        response = session.post(f'{base_url}/api/login', json={'username': USER['username'], 'password': USER['password']})
+        response.raise_for_status()
+        sessions.append(session)
+    return sessions
+
+def request_factory(endpoint, base_url, locations):
+    if endpoint == 'air_pollution':
+        return lambda session, index: session.post(f'{base_url}/api/air_pollution', json=locations[index % len(locations)])
+    if endpoint == 'chatbot':
+        return lambda session, index: session.post(f'{base_url}/api/chatbot', json={'message': f'Is it safe to jog today? ({index})'})
+    return lambda session, index: session.get(f'{base_url}/api/history', params={'limit': 20})
+
+def run_level(send, sessions, concurrency, total):
+    latencies = [0.0] * total
+    statuses = [0] * total
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def client(session):
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            start = time.perf_counter()
+            try:
+                statuses[index] = send(session, index).status_code
+            except requests.RequestException:
+                statuses[index] = 0
+            latencies[index] = time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, sessions[:concurrency]))
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': sum(1 for status in statuses if not 200 <= status < 300),
+        'duration_s': round(elapsed, 3),
+        'rps': round(total / elapsed, 2),
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(p95, 2),
+        'p99_ms': round(p99, 2),
+        'mean_ms': round(float(np.mean(latencies)) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    levels = [int(level) for level in args.concurrency.split(',')]
+    endpoints = [endpoint for endpoint in args.endpoints.split(',') if endpoint]
+
+    openweather = FakeOpenWeather(args.openweather_latency, args.openweather_failure_rate).start()
+    gemini = FakeGemini(args.gemini_latency, args.gemini_failure_rate)
+    app = load_app(args, openweather, gemini)
+    base_url, stop_server = start_server(args.server, app)
+
+    import air_pollution
+    rng = random.Random(args.seed)
+    locations = [{'latitude': round(rng.uniform(-60, 60), 4), 'longitude': round(rng.uniform(-180, 180), 4)}
+                 for _ in range(args.locations)]
+    sessions = login_sessions(base_url, max(levels))
+
+    results = []
+    try:
+        for endpoint in endpoints:
+            send = request_factory(endpoint, base_url, locations)
+            for concurrency in levels:
+                # every level starts cold so the levels are comparable
+                air_pollution.current_cache.clear()
+                air_pollution.forecast_cache.clear()
+                result = {'endpoint': endpoint, **run_level(send, sessions, concurrency, args.requests)}
+                results.append(result)
+                print(f"{endpoint:>14} c={concurrency:<4} {result['rps']:>8.1f} req/s  "
+                      f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                      f"p99 {result['p99_ms']:>8.1f} ms  errors {result['errors']}")
+    finally:
+        stop_server()
+        openweather.stop()
+
+    baseline = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'upstream_calls': {'openweather': openweather.calls, 'gemini': gemini.calls},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(baseline, f, indent=2)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def grid_key(latitude, longitude, cell_size):
+    # Snap a coordinate onto a lat/lon grid so nearby lookups share one entry; the small
+    # epsilon keeps values on a cell edge (31.52 / 0.01 == 3151.9999...) in the right cell
+    return (math.floor(float(latitude) / cell_size + 1e-9), math.floor(float(longitude) / cell_size + 1e-9))
+
+
+class TTLCache:
+    # Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+    # With a `stale_ttl`, expired entries are kept that much longer for get_stale().
+
+    def __init__(self, ttl, max_entries=1024, stale_ttl=0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._data = OrderedDict()  # key -> (expires_at, value, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is None or entry[0] <= now:
+                if entry is not None and entry[0] + self.stale_ttl <= now:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)  # mark as most recently used
+            self.hits += 1
+            return entry[1]
+
+    def get_stale(self, key):
+        # An expired entry still within the stale window, as (value, seconds since it was
+        # stored); None if there is none
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is None or entry[0] + self.stale_ttl <= now:
+                return None
+            self.stale_hits += 1
+            return entry[1], now - entry[2]
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value, now)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)  # evict least recently used
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.stale_hits = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # Whether `key` has a fresh entry, without counting a lookup or touching its LRU position
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'size': len(self._data),
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
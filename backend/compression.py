@@ -0,0 +1,53 @@
+import gzip
+
+try:
+    import brotli  # optional; gzip is used when it isn't installed
+except ImportError:
+    brotli = None
+
+from config import Config
+
+def encoders():
+    # Preferred first when the client rates them equally
+    available = {'gzip': lambda data: gzip.compress(data, compresslevel=Config.COMPRESSION_GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        available = {'br': lambda data: brotli.compress(data, quality=Config.COMPRESSION_BROTLI_QUALITY), **available}
+    return available
+
+def choose_encoding(accept_encodings, available):
+    # Highest q-value the client gave; ties go to the order of `available`
+    best, best_quality = None, 0
+    for name in available:
+        quality = accept_encodings[name]
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def compressible(response):
+    return (response.status_code >= 200 and response.status_code not in (204, 206, 304)
+            and not response.is_streamed and not response.direct_passthrough
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in Config.COMPRESSION_MIMETYPES)
+
+def init_app(app):
+    from flask import request
+    available = encoders()
+
+    @app.after_request
+    def compress_response(response):
+        # Large JSON bodies (the air pollution forecast is tens of kB) are sent gzip or
+        # brotli encoded when the client accepts it. Streamed responses (SSE chat) are
+        # left alone so each event still reaches the client as soon as it is written.
+        if not compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < Config.COMPRESSION_MIN_SIZE:
+            return response
+        encoding = choose_encoding(request.accept_encodings, available)
+        if encoding is None:
+            return response
+
+        response.set_data(available[encoding](data))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,108 @@
+import re
+from gemini_config import model
+from models import db, ChatHistory, Conversation
+from jobs import job_queue
+from metrics import gemini_timer
+from config import Config
+
+SUMMARY_PROMPT = (
+    "Summarize the following conversation between a user and an air quality assistant in at most {words} words. "
+    "Keep facts the user shared (location, health conditions, preferences) and the advice already given. "
+    "Write plain text without any Markdown or formatting.\n\n"
+    "Summary so far:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+def estimate_tokens(text):
+    # Rough 4-characters-per-token estimate; avoids a count_tokens round-trip per turn
+    return len(text) // 4 + 1
+
+def plain_text(html):
+    return re.sub(r'\s+', ' ', re.sub(r'<[^>]+>', ' ', str(html))).strip()
+
+def get_or_create_conversation(user_id, conversation_id=None):
+    if conversation_id is None:
+        # Inserted together with its first turn (see save_chat), so no write transaction
+        # is held open while Gemini answers
+        return Conversation(user_id=user_id)
+
+    conversation = db.session.get(Conversation, int(conversation_id))
+    if conversation is None or conversation.user_id != user_id:
+        return None
+    return conversation
+
+def unsummarized_turns(conversation, limit):
+    # Newest turns not yet folded into the summary, bounded so the query cost stays flat
+    return (ChatHistory.query
+            .filter(ChatHistory.conversation_id == conversation.id,
+                    ChatHistory.id > conversation.summarized_until)
+            .order_by(ChatHistory.id.desc())
+            .limit(limit)
+            .all())
+
+def build_context(conversation):
+    # Chat history for model.start_chat: the rolling summary first, then as many recent
+    # turns verbatim as fit in the token budget (newest turns take priority)
+    if conversation.id is None:
+        return []  # new conversation, nothing to recall yet
+
+    budget = Config.CHAT_CONTEXT_TOKENS
+    history = []
+
+    if conversation.summary:
+        budget -= estimate_tokens(conversation.summary)
+
+    for turn in unsummarized_turns(conversation, Config.CHAT_RECENT_TURNS):
+        user_text, bot_text = turn.user_input, plain_text(turn.bot_response)
+        cost = estimate_tokens(user_text) + estimate_tokens(bot_text)
+        if cost > budget:
+            break
+        budget -= cost
+        history[:0] = [
+            {'role': 'user', 'parts': [user_text]},
+            {'role': 'model', 'parts': [bot_text]},
+        ]
+
+    if conversation.summary:
+        history[:0] = [
+            {'role': 'user', 'parts': [f"Summary of our conversation so far: {conversation.summary}"]},
+            {'role': 'model', 'parts': ["Understood."]},
+        ]
+    return history
+
+def schedule_summary(conversation):
+    # Fold older turns into the summary once they fall out of the verbatim window
+    pending = (ChatHistory.query
+               .filter(ChatHistory.conversation_id == conversation.id,
+                       ChatHistory.id > conversation.summarized_until)
+               .count())
+    if pending > Config.CHAT_RECENT_TURNS + Config.CHAT_SUMMARY_BATCH:
+        job_queue.submit('conversation_summary', {'conversation_id': conversation.id})
+
+@job_queue.register('conversation_summary')
+def summarize_conversation(payload):
+    conversation = db.session.get(Conversation, payload['conversation_id'])
+    if conversation is None:
+        return
+
+    recent_ids = [turn.id for turn in unsummarized_turns(conversation, Config.CHAT_RECENT_TURNS)]
+    if not recent_ids:
+        return
+    turns = (ChatHistory.query
+             .filter(ChatHistory.conversation_id == conversation.id,
+                     ChatHistory.id > conversation.summarized_until,
+                     ChatHistory.id < min(recent_ids))
+             .order_by(ChatHistory.id)
+             .all())
+    if not turns:
+        return  # another job already folded these turns
+
+    transcript = '\n'.join(f"User: {turn.user_input}\nAssistant: {plain_text(turn.bot_response)}" for turn in turns)
+    prompt = SUMMARY_PROMPT.format(
+        words=Config.CHAT_SUMMARY_WORDS,
+        summary=conversation.summary or "(none)",
+        turns=transcript,
+    )
+    with gemini_timer('summary'):
+        conversation.summary = model.start_chat(history=[]).send_message(prompt).text.strip()
+    conversation.summarized_until = turns[-1].id
+    db.session.commit()
@@ -0,0 +1,19 @@
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+@event.listens_for(Engine, 'connect')
+def tune_sqlite(dbapi_connection, connection_record):
+    # No-op for other databases. In WAL mode readers never block the writer (and vice
+    # versa), and synchronous=NORMAL only fsyncs at checkpoints, which is still crash-safe
+    # in WAL. busy_timeout makes a writer wait for the lock instead of failing with
+    # "database is locked".
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    if Config.SQLITE_WAL:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT * 1000)}')
+    cursor.close()
@@ -0,0 +1,95 @@
+from datetime import datetime
+import numpy as np
+
+WEEKLY_FIELDS = ('co', 'pm2_5')
+HOURLY_FIELDS = ('pm2_5', 'pm10')
+DAILY_FIELDS = ('pm2_5', 'pm10', 'co', 'o3', 'so2')
+
+def empty_forecast():
+    return {
+        'weekly_forecast': [],
+        'hourly_data': [],
+        'hourly_pm25': [],
+        'hourly_pm10': [],
+        'daily_data': [],
+    }
+
+def to_columns(forecast_list):
+    # Decode the OpenWeather forecast list once into parallel arrays
+    count = len(forecast_list)
+    components = [forecast['components'] for forecast in forecast_list]
+    columns = {
+        'dt': np.fromiter((forecast['dt'] for forecast in forecast_list), dtype=np.int64, count=count),
+        'aqi': np.fromiter((forecast['main']['aqi'] for forecast in forecast_list), dtype=np.int64, count=count),
+    }
+    for field in set(WEEKLY_FIELDS + HOURLY_FIELDS + DAILY_FIELDS):
+        columns[field] = np.fromiter((c.get(field, 0) for c in components), dtype=np.float64, count=count)
+    return columns
+
+def transform_forecast(forecast_data):
+    forecast_list = forecast_data['list']
+    if not forecast_list:
+        return empty_forecast()
+
+    columns = to_columns(forecast_list)
+    moments = [datetime.fromtimestamp(ts) for ts in columns['dt'].tolist()]
+
+    # Entries are in time order, so each calendar day is one contiguous run
+    ordinals = np.fromiter((moment.toordinal() for moment in moments), dtype=np.int64, count=len(moments))
+    starts = np.flatnonzero(np.r_[True, ordinals[1:] != ordinals[:-1]])
+    ends = np.r_[starts[1:], len(ordinals)]
+    counts = ends - starts
+
+    aqi = columns['aqi'].tolist()
+    values = {field: columns[field].tolist() for field in columns}
+
+    # === Hourly Data ===
+    times = ['%02d:%02d:%02d' % (moment.hour, moment.minute, moment.second) for moment in moments]
+    hourly_data = [{'time': t, 'value': v} for t, v in zip(times, aqi)]
+    hourly_pm25 = [{'time': t, 'value': v} for t, v in zip(times, values['pm2_5'])]
+    hourly_pm10 = [{'time': t, 'value': v} for t, v in zip(times, values['pm10'])]
+
+    # === Weekly Grouping === (day header carries the first sample of the day, as before)
+    items = [{'aqi': a, 'co': co, 'pm2_5': pm} for a, co, pm in zip(aqi, values['co'], values['pm2_5'])]
+    weekly_forecast = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        first = moments[start]
+        weekly_forecast.append({
+            'day': first.strftime('%A'),
+            'date': first.strftime('%d %b %Y'),
+            'aqi': aqi[start],
+            'co': values['co'][start],
+            'pm2_5': values['pm2_5'][start],
+            'forecasts': items[start:end],
+        })
+
+    # === Daily Aggregation === (worst AQI of the day, mean pollutant levels, plus full stats)
+    stats = {'aqi': day_stats(columns['aqi'], starts, counts)}
+    for field in DAILY_FIELDS:
+        stats[field] = day_stats(columns[field], starts, counts)
+
+    daily_data = []
+    for day, start in enumerate(starts.tolist()):
+        entry = {'date': moments[start].strftime('%Y-%m-%d'), 'aqi': stats['aqi']['max'][day]}
+        for field in DAILY_FIELDS:
+            entry[field] = stats[field]['mean'][day]
+        entry['stats'] = {
+            field: {name: stats[field][name][day] for name in ('mean', 'max', 'min')}
+            for field in stats
+        }
+        daily_data.append(entry)
+
+    return {
+        'weekly_forecast': weekly_forecast,
+        'hourly_data': hourly_data,
+        'hourly_pm25': hourly_pm25,
+        'hourly_pm10': hourly_pm10,
+        'daily_data': daily_data,
+    }
+
+def day_stats(column, starts, counts):
+    return {
+        'mean': np.round(np.add.reduceat(column, starts) / counts, 2).tolist(),
+        'max': np.maximum.reduceat(column, starts).tolist(),
+        'min': np.minimum.reduceat(column, starts).tolist(),
+    }
@@ -1,11 +1,11 @@
-import google.generativeai as genai # llibrary
 from dotenv import load_dotenv
 import os
+import threading
+from throttle import CircuitBreaker, TokenBucket
+from config import Config
 
 load_dotenv()  # Load environment variables from .env
 
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-
 generation_config = {
     "temperature": 1,
     "top_p": 0.95,
@@ -14,13 +14,100 @@ generation_config = {
     "response_mime_type": "text/plain",
 }
 
-model = genai.GenerativeModel(
-    model_name="gemini-2.0-flash",
-    generation_config=generation_config,
-    system_instruction=(
-        "Act as a knowledgeable and approachable environmental science guide, tailoring insights and actionable advice based on the Air Quality Index (AQI) levels."
-        " AQI is 1 good ,AQI is 2 Moderate , AQI is 3 Unhealthy for Sensitive Groups, AQI is 4 Very Unhealthy for all, AQI is 5 Hazardous."
-        " Provide clear and concise recommendations and suggestions as separate outputs. Recommendations should be specific actions to take for the current AQI level."
-        " Suggestions should include long-term or broader strategies to improve air quality or minimize risks in the future."
-    ),
+system_instruction = (
+    "Act as a knowledgeable and approachable environmental science guide, tailoring insights and actionable advice based on the Air Quality Index (AQI) levels."
+    " AQI is 1 good ,AQI is 2 Moderate , AQI is 3 Unhealthy for Sensitive Groups, AQI is 4 Very Unhealthy for all, AQI is 5 Hazardous."
+    " Provide clear and concise recommendations and suggestions as separate outputs. Recommendations should be specific actions to take for the current AQI level."
+    " Suggestions should include long-term or broader strategies to improve air quality or minimize risks in the future."
 )
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    # The SDK import and client setup happen on the first Gemini call rather than at
+    # import time, so starting a worker doesn't pay for them
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai # llibrary
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                _model = genai.GenerativeModel(
+                    model_name="gemini-2.0-flash",
+                    generation_config=generation_config,
+                    system_instruction=system_instruction,
+                )
+    return _model
+
+
+# Every Gemini request (advice, chat, titles, summaries) spends a token of this budget
+# and is refused straight away while the breaker is open
+gemini_budget = TokenBucket('gemini', Config.GEMINI_RATE_PER_MIN, Config.GEMINI_BURST, Config.UPSTREAM_BUDGET_MAX_WAIT)
+gemini_breaker = CircuitBreaker('gemini', Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_TIMEOUT)
+
+def call_gemini(func, *args, **kwargs):
+    gemini_breaker.before_call()
+    try:
+        gemini_budget.acquire()
+    except BaseException:  # budget exhausted or cancelled: Gemini was never reached
+        gemini_breaker.abandon()
+        raise
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    except BaseException:
+        gemini_breaker.abandon()
+        raise
+    gemini_breaker.record_success()
+    return result
+
+async def call_gemini_async(func, *args, **kwargs):
+    gemini_breaker.before_call()
+    try:
+        await gemini_budget.acquire_async()
+    except BaseException:  # budget exhausted or cancelled: Gemini was never reached
+        gemini_breaker.abandon()
+        raise
+    try:
+        result = await func(*args, **kwargs)
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    except BaseException:
+        gemini_breaker.abandon()
+        raise
+    gemini_breaker.record_success()
+    return result
+
+
+class BudgetedChat:
+    # ChatSession whose messages go through call_gemini
+    def __init__(self, session):
+        self._session = session
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def send_message(self, *args, **kwargs):
+        return call_gemini(self._session.send_message, *args, **kwargs)
+
+    async def send_message_async(self, *args, **kwargs):
+        return await call_gemini_async(self._session.send_message_async, *args, **kwargs)
+
+
+class LazyModel:
+    # Stands in for the GenerativeModel so callers keep using model.start_chat(...) etc.
+    def __getattr__(self, name):
+        return getattr(get_model(), name)
+
+    def generate_content(self, *args, **kwargs):
+        return call_gemini(get_model().generate_content, *args, **kwargs)
+
+    def start_chat(self, *args, **kwargs):
+        return BudgetedChat(get_model().start_chat(*args, **kwargs))
+
+
+model = LazyModel()
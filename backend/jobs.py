@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+import json
+import queue
+import threading
+import time
+from sqlalchemy import event
+from models import db, BackgroundJob
+from config import Config
+
+class JobQueue:
+    # In-process worker pool backed by the background_job table. Jobs are written to the
+    # database before they are dispatched, so pending work survives a restart and is
+    # picked up again by recover().
+
+    def __init__(self, workers=2, max_attempts=3, retry_delay=5, stale_after=300):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_after = stale_after
+        self.handlers = {}
+        self.app = None
+        self._queue = queue.Queue()
+        self._threads = []
+        event.listen(db.session, 'after_commit', self._dispatch_submitted)
+        event.listen(db.session, 'after_rollback', self._discard_submitted)
+
+    def init_app(self, app):
+        self.app = app
+
+    def register(self, kind):
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    def start(self):
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        try:
+            self.recover()
+        except Exception as e:
+            print(f"Could not recover pending jobs: {e!r}")
+
+    def submit(self, kind, payload):
+        # Adds the job to the caller's transaction without committing it. The job is
+        # dispatched once the caller commits, and is dropped with everything else on rollback.
+        job = BackgroundJob(kind=kind, payload=json.dumps(payload))
+        db.session.add(job)
+        db.session.flush()
+        db.session.info.setdefault(self, []).append(job.id)
+        return job.id
+
+    def _dispatch_submitted(self, session):
+        for job_id in session.info.pop(self, ()):
+            self._queue.put(job_id)
+
+    def _discard_submitted(self, session):
+        session.info.pop(self, None)
+
+    def recover(self):
+        # Re-dispatch jobs left pending, or stuck running, by a previous process
+        with self.app.app_context():
+            stale = datetime.utcnow() - timedelta(seconds=self.stale_after)
+            jobs = BackgroundJob.query.filter(
+                (BackgroundJob.status == 'pending') |
+                ((BackgroundJob.status == 'running') & (BackgroundJob.updated_at < stale))
+            ).order_by(BackgroundJob.id).all()
+            for job in jobs:
+                job.status = 'pending'
+            db.session.commit()
+            for job in jobs:
+                self._queue.put(job.id)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._run(job_id)
+            except Exception as e:
+                print(f"Job {job_id} crashed the worker loop: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        # Claim the job atomically so another process recovering the same row skips it
+        claimed = BackgroundJob.query.filter_by(id=job_id, status='pending').update(
+            {'status': 'running', 'attempts': BackgroundJob.attempts + 1, 'updated_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(BackgroundJob, job_id)
+        try:
+            self.handlers[job.kind](json.loads(job.payload))
+            db.session.delete(job)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(BackgroundJob, job_id)
+            print(f"Job {job_id} ({job.kind}) failed on attempt {job.attempts}: {e!r}")
+            if job.attempts >= self.max_attempts:
+                job.status = 'failed'
+                db.session.commit()
+            else:
+                job.status = 'pending'
+                db.session.commit()
+                timer = threading.Timer(self.retry_delay * job.attempts, self._queue.put, [job_id])
+                timer.daemon = True
+                timer.start()
+
+    def schedule(self, kind, interval, payload=None):
+        # Submit `kind` every `interval` seconds. A run is skipped while an earlier one is
+        # still pending or running, including one submitted by another worker process.
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    with self.app.app_context():
+                        busy = BackgroundJob.query.filter(
+                            BackgroundJob.kind == kind,
+                            BackgroundJob.status.in_(('pending', 'running'))
+                        ).first()
+                        if busy is None:
+                            self.submit(kind, payload or {})
+                            db.session.commit()
+                except Exception as e:
+                    print(f"Could not schedule {kind}: {e!r}")
+
+        thread = threading.Thread(target=loop, name=f'schedule-{kind}', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def join(self):
+        self._queue.join()
+
+
+job_queue = JobQueue(Config.JOB_WORKERS, Config.JOB_MAX_ATTEMPTS, Config.JOB_RETRY_DELAY)
@@ -0,0 +1,327 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import glob
+import json
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # One metric family. Samples are keyed by label values; updates only take a lock and
+    # touch a dict, so instrumenting a hot path costs about a microsecond.
+
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def snapshot(self):
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {'type': self.type, 'help': self.documentation, 'labels': list(self.labels), 'samples': samples}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        # For totals tracked elsewhere (e.g. TTLCache.hits), mirrored in by a collector
+        with self._lock:
+            self._values[self.key(labels)] = value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), mode='sum'):
+        # mode: 'sum' adds the workers' values together, 'pid' keeps one series per worker
+        super().__init__(name, documentation, labels)
+        self.mode = mode
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self.key(labels)] = value
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot['mode'] = self.mode
+        return snapshot
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]  # per-bucket counts, +Inf, sum
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot['buckets'] = list(self.buckets)
+        return snapshot
+
+
+class Registry:
+    # Process-local metrics. With several worker processes (gunicorn/uvicorn --workers)
+    # set METRICS_DIR: every worker then writes its snapshot there periodically and
+    # /metrics merges all of them, so a scrape sees the whole server whichever worker answers.
+
+    def __init__(self, directory=None, flush_interval=10, stale_after=300):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after
+        self.metrics = {}
+        self.collectors = []
+        self._thread = None
+        self._write_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), mode='sum'):
+        return self.register(Gauge(name, documentation, labels, mode))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, func):
+        # Called before each snapshot to copy in values that are tracked elsewhere
+        self.collectors.append(func)
+        return func
+
+    def snapshot(self):
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector {collect.__name__} failed: {e!r}")
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    # === Multi-process support ===
+
+    def snapshot_path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    def write_snapshot(self):
+        path = self.snapshot_path()
+        with self._write_lock:
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f'{path}.tmp', path)  # readers never see a half-written file
+
+    def start(self):
+        if not self.directory or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                print(f"Could not write metrics snapshot: {e!r}")
+
+    def collect(self):
+        # Snapshots of every live worker; files from workers that stopped writing are skipped
+        if not self.directory:
+            return [(os.getpid(), self.snapshot())]
+
+        self.write_snapshot()
+        snapshots = []
+        cutoff = time.time() - self.stale_after
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    continue
+                with open(path) as f:
+                    snapshots.append((os.path.basename(path)[8:-5], json.load(f)))
+            except (OSError, ValueError):
+                continue  # removed or replaced while we were reading it
+        return snapshots
+
+    # === Exposition ===
+
+    def render(self):
+        merged = {}
+        for pid, snapshot in self.collect():
+            for name, family in snapshot.items():
+                target = merged.setdefault(name, {**family, 'samples': {}})
+                per_pid = family.get('mode') == 'pid'
+                for labels, value in family['samples']:
+                    key = tuple(labels) + ((str(pid),) if per_pid else ())
+                    if family['type'] == 'histogram':
+                        current = target['samples'].get(key)
+                        target['samples'][key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        target['samples'][key] = target['samples'].get(key, 0) + value
+
+        lines = []
+        for name, family in sorted(merged.items()):
+            labels = family['labels'] + (['pid'] if family.get('mode') == 'pid' else [])
+            lines.append(f"# HELP {name} {escape(family['help'])}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for key, value in sorted(family['samples'].items()):
+                if family['type'] != 'histogram':
+                    lines.append(f"{name}{format_labels(labels, key)} {format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(family['buckets'] + ['+Inf'], value[:-1]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{format_labels(labels, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels, key)} {format_value(value[-1])}")
+                lines.append(f"{name}_count{format_labels(labels, key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(Config.METRICS_DIR, Config.METRICS_FLUSH_INTERVAL, Config.METRICS_STALE_AFTER)
+
+# === Hot-path metrics ===
+
+http_request_seconds = registry.histogram(
+    'http_request_duration_seconds', 'Time spent handling a request', ('endpoint', 'method', 'status'))
+http_response_bytes = registry.histogram(
+    'http_response_size_bytes', 'Response body size', ('endpoint',), SIZE_BUCKETS)
+upstream_request_seconds = registry.histogram(
+    'upstream_request_duration_seconds', 'Third-party HTTP calls, one observation per attempt', ('host', 'status'))
+gemini_request_seconds = registry.histogram(
+    'gemini_request_duration_seconds', 'Gemini calls by purpose', ('operation', 'outcome'))
+stage_seconds = registry.histogram(
+    'stage_duration_seconds', 'Time spent in each stage of the air pollution pipeline', ('stage',))
+db_query_seconds = registry.histogram(
+    'db_query_duration_seconds', 'SQL statement execution time', ('statement',))
+cache_hits = registry.counter('cache_hits_total', 'Cache lookups answered from memory', ('cache',))
+cache_misses = registry.counter('cache_misses_total', 'Cache lookups that fell through', ('cache',))
+cache_stale_hits = registry.counter('cache_stale_hits_total', 'Expired entries served while being refreshed', ('cache',))
+cache_entries = registry.gauge('cache_entries', 'Entries currently cached', ('cache',))
+cache_hit_ratio = registry.gauge('cache_hit_ratio', 'Share of lookups served from the cache', ('cache',), mode='pid')
+upstream_budget_wait_seconds = registry.histogram(
+    'upstream_budget_wait_seconds', 'Time calls queued for a token of the upstream budget', ('upstream',))
+upstream_budget_rejections = registry.counter(
+    'upstream_budget_rejections_total', 'Calls refused because the upstream budget was exhausted', ('upstream',))
+circuit_state = registry.gauge(
+    'circuit_state', 'Upstream circuit breaker: 0 closed, 1 half-open, 2 open', ('upstream',), mode='pid')
+circuit_rejections = registry.counter(
+    'circuit_rejections_total', 'Calls failed fast because the upstream circuit was open', ('upstream',))
+upstream_coalesced = registry.counter(
+    'upstream_coalesced_total', 'Calls that shared an identical in-flight upstream call', ('upstream',))
+approximate_lookups = registry.counter(
+    'air_approximate_lookups_total', 'Air pollution requests answered from nearby readings', ('method', 'outcome'))
+
+@contextmanager
+def gemini_timer(operation):
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        gemini_request_seconds.observe(time.perf_counter() - start, operation=operation, outcome=outcome)
+
+def watch_cache(name, cache):
+    @registry.collector
+    def collect_cache():
+        stats = cache.stats()
+        cache_hits.set(stats['hits'], cache=name)
+        cache_misses.set(stats['misses'], cache=name)
+        cache_stale_hits.set(stats['stale_hits'], cache=name)
+        cache_entries.set(stats['size'], cache=name)
+        cache_hit_ratio.set(stats['hit_ratio'], cache=name)
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def observe_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    db_query_seconds.observe(elapsed, statement=statement.lstrip().split(None, 1)[0].upper())
+
+def discard_query_timer(exception_context):
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+def init_app(app):
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_seconds.observe(time.perf_counter() - started,
+                                         endpoint=endpoint, method=request.method, status=response.status_code)
+            if not response.is_streamed:
+                http_response_bytes.observe(response.calculate_content_length() or 0, endpoint=endpoint)
+        return response
+
+    # Engine-wide listeners; registered once even if several apps are created
+    if not event.contains(Engine, 'before_cursor_execute', start_query_timer):
+        event.listen(Engine, 'before_cursor_execute', start_query_timer)
+        event.listen(Engine, 'after_cursor_execute', observe_query)
+        event.listen(Engine, 'handle_error', discard_query_timer)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    registry.start()
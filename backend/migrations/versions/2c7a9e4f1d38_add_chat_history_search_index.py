@@ -0,0 +1,45 @@
+"""Add full-text search index over chat_history
+
+Revision ID: 2c7a9e4f1d38
+Revises: b5d81f3c6e27
+Create Date: 2026-10-18 16:21:40.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7a9e4f1d38'
+down_revision = 'b5d81f3c6e27'
+branch_labels = None
+depends_on = None
+
+# The index objects are defined once, in search.py. On SQLite a later
+# batch_alter_table('chat_history') recreates the table and drops the delete trigger,
+# so such a migration has to run search.SEARCH_DDL again.
+
+
+def upgrade():
+    from search import SEARCH_DDL, index_chats
+
+    bind = op.get_bind()
+    for statement in SEARCH_DDL.get(bind.dialect.name, ()):
+        op.execute(statement)
+    # index the rows that already exist, in batches
+    chats = sa.text("SELECT id, title, user_input, bot_response FROM chat_history "
+                    "WHERE id > :last_id ORDER BY id LIMIT 500")
+    last_id = 0
+    while True:
+        rows = bind.execute(chats, {'last_id': last_id}).fetchall()
+        if not rows:
+            break
+        index_chats(bind, rows)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    from search import SEARCH_DROP
+
+    for statement in SEARCH_DROP.get(op.get_bind().dialect.name, ()):
+        op.execute(statement)
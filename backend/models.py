@@ -32,14 +32,73 @@ class User(db.Model , UserMixin):
 # ===================== CHAT HISTORY MODEL =======================
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
+    __table_args__ = (
+        # history listings filter by user and walk newest-first
+        db.Index('ix_chat_history_user_id_timestamp', 'user_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user_input = db.Column(db.Text, nullable=False)
     bot_response = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     title = db.Column(db.String(150), nullable=True)  
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=True, index=True)
+    restored_at = db.Column(db.DateTime, nullable=True)  # brought back from the archive; retention counts from here
     
     user = db.relationship('User', backref=db.backref('chats', lazy=True))
 
     def __repr__(self):
         return f"<ChatHistory {self.id} - {self.timestamp}>"
+
+# ===================== CONVERSATION MODEL =======================
+class Conversation(db.Model):
+    __tablename__ = 'conversation'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    summary = db.Column(db.Text, nullable=True)  # rolling summary of the older turns
+    summarized_until = db.Column(db.Integer, nullable=False, default=0)  # last chat_history.id folded into summary
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    turns = db.relationship('ChatHistory', backref='conversation', lazy='dynamic')
+
+    def __repr__(self):
+        return f"<Conversation {self.id} - user {self.user_id}>"
+
+# ===================== AQI READING MODEL =======================
+class AqiReading(db.Model):
+    # One OpenWeather reading per grid cell and timestamp (see cache.grid_key)
+    __tablename__ = 'aqi_reading'
+    __table_args__ = (
+        db.UniqueConstraint('cell_lat', 'cell_lon', 'dt', name='uq_aqi_reading_cell_dt'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    cell_lat = db.Column(db.Integer, nullable=False)
+    cell_lon = db.Column(db.Integer, nullable=False)
+    dt = db.Column(db.Integer, nullable=False)  # unix timestamp of the reading
+    aqi = db.Column(db.SmallInteger, nullable=False)
+    co = db.Column(db.Float)
+    no = db.Column(db.Float)
+    no2 = db.Column(db.Float)
+    o3 = db.Column(db.Float)
+    so2 = db.Column(db.Float)
+    pm2_5 = db.Column(db.Float)
+    pm10 = db.Column(db.Float)
+    nh3 = db.Column(db.Float)
+
+    def __repr__(self):
+        return f"<AqiReading ({self.cell_lat}, {self.cell_lon}) @ {self.dt}>"
+
+# ===================== BACKGROUND JOB MODEL =======================
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_job'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON encoded arguments
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<BackgroundJob {self.id} {self.kind} {self.status}>"
@@ -0,0 +1,109 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # several times faster than the stdlib encoder for the forecast payloads
+except ImportError:
+    orjson = None
+
+FORMATS = ('full', 'compact')
+
+DAILY_FIELDS = ('aqi', 'pm2_5', 'pm10', 'co', 'o3', 'so2')
+STAT_NAMES = ('mean', 'max', 'min')
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Same output as Flask's provider (dates as HTTP dates, sorted keys when configured),
+    # encoded by orjson. Anything orjson can't handle natively goes through Flask's default().
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def encode(self, obj):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(obj)
+        return self._app.response_class(self.encode(obj) + b'\n', mimetype=self.mimetype)
+
+def init_app(app):
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+def parse_options(request_data):
+    # {"format": "compact", "fields": ["air_pollution_data", "hourly.aqi", ...]}; fields may
+    # also be a comma separated string. Raises ValueError for anything else.
+    response_format = request_data.get('format') or 'full'
+    if response_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+
+    fields = request_data.get('fields')
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    if fields is not None and not (isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+        raise ValueError("fields must be a list of field names")
+    return response_format, fields
+
+def compact_air_pollution(response_data):
+    # One time axis with parallel value arrays instead of {time, value} dicts repeated
+    # across hourly_data/hourly_pm25/hourly_pm10 and the per-day weekly_forecast lists.
+    # weekly.start/count index into the hourly arrays: the weekly day headers are the
+    # hourly values at `start`.
+    weekly_forecast = response_data['weekly_forecast']
+    hourly_data = response_data['hourly_data']
+    items = [item for day in weekly_forecast for item in day['forecasts']]
+    hourly = {
+        'time': [entry['time'] for entry in hourly_data],
+        'aqi': [entry['value'] for entry in hourly_data],
+        'pm2_5': [entry['value'] for entry in response_data['hourly_pm25']],
+        'pm10': [entry['value'] for entry in response_data['hourly_pm10']],
+        'co': [item['co'] for item in items],
+    }
+
+    weekly = {'day': [], 'date': [], 'start': [], 'count': []}
+    start = 0
+    for day in weekly_forecast:
+        weekly['day'].append(day['day'])
+        weekly['date'].append(day['date'])
+        weekly['start'].append(start)
+        weekly['count'].append(len(day['forecasts']))
+        start += len(day['forecasts'])
+
+    daily_data = response_data['daily_data']
+    daily = {'date': [entry['date'] for entry in daily_data]}
+    for field in DAILY_FIELDS:
+        daily[field] = [entry.get(field) for entry in daily_data]
+    stat_fields = daily_data[0]['stats'] if daily_data else {}
+    daily['stats'] = {
+        field: {name: [entry['stats'][field][name] for entry in daily_data] for name in STAT_NAMES}
+        for field in stat_fields
+    }
+
+    compact = {key: value for key, value in response_data.items()
+               if key not in ('weekly_forecast', 'hourly_data', 'hourly_pm25', 'hourly_pm10', 'daily_data')}
+    compact.update(format='compact', hourly=hourly, weekly=weekly, daily=daily)
+    return compact
+
+def select_fields(response_data, fields):
+    # Top-level names keep the whole value; "group.column" keeps single columns of a
+    # compact group (e.g. hourly.aqi). Unknown names are ignored.
+    if not fields:
+        return response_data
+    selected = {}
+    for field in fields:
+        name, _, column = field.partition('.')
+        if name not in response_data:
+            continue
+        value = response_data[name]
+        if column and isinstance(value, dict):
+            if column in value:
+                selected.setdefault(name, {})[column] = value[column]
+        else:
+            selected[name] = value
+    if 'format' in response_data:
+        selected['format'] = response_data['format']
+    return selected
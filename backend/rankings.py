@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import threading
+from config import Config
+from upstream import upstream
+
+CITIES = [
+    "Lahore", "Karachi", "Faisalabad", "Gujranwala", "Peshawar",
+    "Islamabad", "Rawalpindi", "Sialkot", "Multan", "Quetta",
+    "Sheikhupura", "Bahawalpur", "Sargodha", "Hyderabad", "Okara"
+]
+
+def get_air_quality_description(aqi):
+    if aqi <= 50: return "Good", "#4CAF50"
+    if aqi <= 100: return "Moderate", "#FFCA28"
+    if aqi <= 150: return "Unhealthy for Sensitive Groups", "#FF5722"
+    if aqi <= 200: return "Unhealthy", "#D81B60"
+    if aqi <= 300: return "Very Unhealthy", "#8E24AA"
+    return "Hazardous", "#5E35B1"
+
+def fetch_city_aqi(city):
+    response = upstream.get(
+        'https://api.api-ninjas.com/v1/airquality',
+        params={'city': city},
+        headers={'X-Api-Key': os.getenv('API_NINJAS_KEY')},
+    )
+    response.raise_for_status()
+    data = response.json()
+    if not data or data.get('overall_aqi') is None:
+        return {'city': city, 'aqi': "N/A", 'quality': "Data not available", 'color': "#B0BEC5"}
+
+    quality, color = get_air_quality_description(data['overall_aqi'])
+    return {'city': city, 'aqi': data['overall_aqi'], 'quality': quality, 'color': color}
+
+
+class RankingService:
+    # Refreshes the city list on an interval and keeps the sorted ranking pre-serialized,
+    # so serving it costs the same no matter how many page views there are.
+
+    def __init__(self, cities, interval, workers=4):
+        self.cities = cities
+        self.interval = interval
+        self.workers = workers
+        self._payload = None
+        self._previous = {}  # city -> last successful row
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='rankings-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Ranking refresh failed: {e!r}")
+            self._ready.set()  # the first attempt is over, even if it failed
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rankings') as executor:
+            results = list(executor.map(self._fetch, self.cities))
+
+        valid = sorted((row for row in results if isinstance(row['aqi'], (int, float))),
+                       key=lambda row: row['aqi'], reverse=True)
+        errors = [row for row in results if not isinstance(row['aqi'], (int, float))]
+        for rank, row in enumerate(valid, start=1):
+            row['rank'] = rank
+
+        self._payload = json.dumps({
+            'rankings': valid + errors,
+            'updated_at': datetime.utcnow().isoformat(),
+        })
+        self._ready.set()
+
+    def _fetch(self, city):
+        try:
+            row = fetch_city_aqi(city)
+            if isinstance(row['aqi'], (int, float)):
+                self._previous[city] = dict(row)
+            return row
+        except Exception as e:
+            print(f"Ranking fetch failed for {city}: {e!r}")
+            # keep the last known reading rather than dropping the city from the table
+            previous = self._previous.get(city)
+            if previous is not None:
+                return dict(previous)
+            return {'city': city, 'aqi': "Error", 'quality': "Error fetching data", 'color': "#B0BEC5"}
+
+    def payload(self, timeout=None):
+        # Pre-serialized JSON of the latest ranking, or None. Only waits while the first
+        # refresh is in progress; without the refresh thread there is nothing to wait for.
+        if self._thread is not None and self._thread.is_alive():
+            self._ready.wait(timeout)
+        return self._payload
+
+
+ranking_service = RankingService(CITIES, Config.RANKINGS_REFRESH_INTERVAL, Config.RANKINGS_WORKERS)
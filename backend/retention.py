@@ -0,0 +1,164 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import glob
+import gzip
+import json
+import os
+from models import db, ChatHistory, Conversation
+from jobs import job_queue
+from config import Config
+
+try:
+    import fcntl  # serialises appends from several worker processes (POSIX only)
+except ImportError:
+    fcntl = None
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'conversation_id', 'user_input', 'bot_response', 'title')
+
+def archive_path(user_id, month):
+    return os.path.join(Config.CHAT_ARCHIVE_DIR, str(user_id), f'{month}.jsonl.gz')
+
+def archive_months(user_id):
+    paths = glob.glob(archive_path(user_id, '*'))
+    return sorted(os.path.basename(path)[:-len('.jsonl.gz')] for path in paths)
+
+def chat_record(chat):
+    record = {name: getattr(chat, name) for name in ARCHIVE_FIELDS}
+    record['bot_response'] = str(record['bot_response'])
+    record['timestamp'] = chat.timestamp.isoformat()
+    return record
+
+@contextmanager
+def locked_archive(path, mode):
+    # Retention runs append to a month file and restores remove it, possibly from
+    # different processes; both hold an exclusive lock on the file while they work
+    while True:
+        f = open(path, mode)
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if os.fstat(f.fileno()).st_nlink == 0:  # a restore removed it while we waited
+                f.close()
+                continue
+        break
+    try:
+        yield f
+    finally:
+        f.close()
+
+def append_archive(path, records):
+    # Each call appends one gzip member; readers see the concatenation as one stream.
+    # The data is fsynced before the caller deletes the rows it came from.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = ''.join(json.dumps(record) + '\n' for record in records).encode()
+    with locked_archive(path, 'ab') as f:
+        f.write(gzip.compress(data))
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_archive(f):
+    with gzip.open(f, 'rt') as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+def archive_chats(chats):
+    by_file = defaultdict(list)
+    for chat in chats:
+        by_file[archive_path(chat.user_id, chat.timestamp.strftime('%Y-%m'))].append(chat_record(chat))
+    for path, records in by_file.items():
+        append_archive(path, records)
+
+def purge_expired_history(days=None, batch_size=None):
+    # Archive and delete turns older than the retention window, one batch per transaction
+    # so the table is never locked for long. Walking the primary key finds the oldest
+    # rows first without needing an index on timestamp.
+    days = Config.HISTORY_RETENTION_DAYS if days is None else days
+    batch_size = batch_size or Config.HISTORY_RETENTION_BATCH
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    expired = db.func.coalesce(ChatHistory.restored_at, ChatHistory.timestamp) < cutoff
+
+    total = 0
+    last_id = 0
+    while True:
+        chats = (ChatHistory.query
+                 .filter(expired, ChatHistory.id > last_id)
+                 .order_by(ChatHistory.id)
+                 .limit(batch_size)
+                 .all())
+        if not chats:
+            break
+        archive_chats(chats)
+        ids = [chat.id for chat in chats]
+        ChatHistory.query.filter(ChatHistory.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        total += len(chats)
+        last_id = ids[-1]
+
+    # Conversations whose turns have all been archived
+    (Conversation.query
+     .filter(Conversation.updated_at < cutoff, ~Conversation.turns.any())
+     .delete(synchronize_session=False))
+    db.session.commit()
+    return total
+
+def restore_history(user_id, month=None):
+    # Put archived turns back into chat_history and remove the month file. Turns already
+    # in the table are skipped, so a retried restore (e.g. the worker died after the
+    # commit but before the file was removed) or a duplicate archive entry is harmless.
+    months = [month] if month else archive_months(user_id)
+    restored = 0
+    now = datetime.utcnow()
+    for archived_month in months:
+        try:
+            with locked_archive(archive_path(user_id, archived_month), 'rb') as f:
+                restored += restore_records(user_id, read_archive(f), now)
+                os.remove(f.name)  # the rows live in the table again
+        except FileNotFoundError:
+            continue
+    return restored
+
+def restore_records(user_id, records, now):
+    # A turn is identified by its owner, timestamp and question rather than by id: an
+    # archived id can belong to someone else's row by now (SQLite reuses the ids of
+    # deleted rows), and such turns are restored under a new id, which a retry has to
+    # recognise as well.
+    timestamps = {datetime.fromisoformat(record['timestamp']) for record in records}
+    present = {(row.timestamp, row.user_input) for row in db.session.query(
+        ChatHistory.timestamp, ChatHistory.user_input).filter(
+        ChatHistory.user_id == user_id, ChatHistory.timestamp.in_(timestamps))}
+    taken = {row.id for row in db.session.query(ChatHistory.id).filter(
+        ChatHistory.id.in_({record['id'] for record in records}))}
+    conversations = {row.id for row in db.session.query(Conversation.id).filter(
+        Conversation.id.in_({record['conversation_id'] for record in records}))}
+
+    kept, renumbered = [], []
+    for record in records:
+        timestamp = datetime.fromisoformat(record['timestamp'])
+        if (timestamp, record['user_input']) in present:
+            continue
+        present.add((timestamp, record['user_input']))
+        chat = ChatHistory(**{name: record[name] for name in ARCHIVE_FIELDS},
+                           timestamp=timestamp, restored_at=now)
+        if chat.conversation_id not in conversations:
+            chat.conversation_id = None  # the conversation was cleaned up after archiving
+        if chat.id in taken:
+            chat.id = None  # the id was reused by another row
+            renumbered.append(chat)
+        else:
+            taken.add(chat.id)
+            kept.append(chat)
+    # New ids are handed out after the rows that keep theirs are in, so they can't collide
+    db.session.add_all(kept)
+    db.session.flush()
+    db.session.add_all(renumbered)
+    db.session.commit()
+    return len(kept) + len(renumbered)
+
+@job_queue.register('chat_retention')
+def run_retention(payload):
+    archived = purge_expired_history(payload.get('days'))
+    if archived:
+        print(f"Archived {archived} chat history rows older than {payload.get('days') or Config.HISTORY_RETENTION_DAYS} days")
+
+@job_queue.register('chat_restore')
+def run_restore(payload):
+    restore_history(payload['user_id'], payload.get('month'))
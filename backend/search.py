@@ -0,0 +1,156 @@
+import html
+import re
+from markupsafe import escape
+from sqlalchemy import event
+from models import db, ChatHistory
+from config import Config
+
+# Full-text index over chat_history. The index keeps its own copy of each turn as plain
+# text: bot_response is stored as HTML (<b>, <br>), and indexing the markup would make
+# "b" or "br" match nearly every chat and put tags inside snippets. Rows are written by
+# the ChatHistory mapper hooks below, so saves, title edits and restores all reindex the
+# turn in the same transaction. Deletes, including retention's bulk purge, are removed by
+# the database itself: a trigger on SQLite, ON DELETE CASCADE on PostgreSQL.
+SQLITE_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+        title, user_input, bot_response, tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS chat_history_fts_delete AFTER DELETE ON chat_history BEGIN
+        DELETE FROM chat_history_fts WHERE rowid = old.id;
+    END""",
+)
+SQLITE_DROP = (
+    "DROP TRIGGER IF EXISTS chat_history_fts_delete",
+    "DROP TABLE IF EXISTS chat_history_fts",
+)
+
+def postgres_document(table):
+    return (f"to_tsvector('english', coalesce({table}.title, '') || ' ' || "
+            f"{table}.user_input || ' ' || {table}.bot_response)")
+
+POSTGRES_DDL = (
+    """CREATE TABLE IF NOT EXISTS chat_history_fts (
+        chat_id INTEGER PRIMARY KEY REFERENCES chat_history (id) ON DELETE CASCADE,
+        title TEXT, user_input TEXT NOT NULL, bot_response TEXT NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_chat_history_fts ON chat_history_fts "
+    f"USING gin (({postgres_document('chat_history_fts')}))",
+)
+POSTGRES_DROP = (
+    "DROP TABLE IF EXISTS chat_history_fts",
+)
+
+SEARCH_DDL = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}
+SEARCH_DROP = {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}
+INDEX_KEY = {'sqlite': 'rowid', 'postgresql': 'chat_id'}
+
+# Snippets mark matches with these control characters; the text around them is escaped
+# before they are turned into <mark> tags (see highlight)
+MARK_START, MARK_END = '\x02', '\x03'
+
+# Title matches count for more than matches in the body of the exchange
+SQLITE_SEARCH = db.text("""
+    SELECT chat_history.id, chat_history.title, chat_history.timestamp,
+           snippet(chat_history_fts, -1, :mark_start, :mark_end, '...', :tokens) AS snippet,
+           bm25(chat_history_fts, 5.0, 1.0, 1.0) AS rank
+    FROM chat_history_fts JOIN chat_history ON chat_history.id = chat_history_fts.rowid
+    WHERE chat_history_fts MATCH :query AND chat_history.user_id = :user_id
+    ORDER BY rank
+    LIMIT :limit
+""").columns(timestamp=db.DateTime)
+
+POSTGRES_SEARCH = db.text(f"""
+    SELECT chat_history.id, chat_history.title, chat_history.timestamp,
+           ts_headline('english', coalesce(fts.title, '') || ' ' || fts.user_input || ' ' || fts.bot_response,
+                       query, 'StartSel=' || :mark_start || ', StopSel=' || :mark_end ||
+                       ', MaxWords=' || :tokens || ', MinWords=5') AS snippet,
+           -ts_rank({postgres_document('fts')}, query) AS rank
+    FROM chat_history_fts AS fts JOIN chat_history ON chat_history.id = fts.chat_id,
+         plainto_tsquery('english', :query) AS query
+    WHERE {postgres_document('fts')} @@ query AND chat_history.user_id = :user_id
+    ORDER BY rank
+    LIMIT :limit
+""").columns(timestamp=db.DateTime)
+
+@event.listens_for(ChatHistory.__table__, 'after_create')
+def create_search_index(table, connection, **kw):
+    # db.create_all() (tests, fresh dev databases); migrated databases get the same
+    # objects from revision 2c7a9e4f1d38
+    for statement in SEARCH_DDL.get(connection.dialect.name, ()):
+        connection.exec_driver_sql(statement)
+
+def plain_text(text, markup=False):
+    # What a reader sees of a stored field, with whitespace collapsed. bot_response is
+    # HTML (markup=True): tags are dropped and entities decoded. Titles and user input
+    # are plain text already. The snippet markers can't occur in indexed text.
+    text = str(text or '')
+    if markup:
+        text = html.unescape(re.sub(r'<[^>]*>', ' ', text))
+    return ' '.join(text.replace(MARK_START, ' ').replace(MARK_END, ' ').split())
+
+def index_chats(connection, chats):
+    # (Re)write the index rows of the given turns; `chats` are ChatHistory objects or rows
+    dialect = connection.dialect.name
+    if dialect not in SEARCH_DDL:
+        return
+    key = INDEX_KEY[dialect]
+    ids = [{'id': chat.id} for chat in chats]
+    if not ids:
+        return
+    connection.execute(db.text(f"DELETE FROM chat_history_fts WHERE {key} = :id"), ids)
+    connection.execute(
+        db.text(f"INSERT INTO chat_history_fts ({key}, title, user_input, bot_response) "
+                "VALUES (:id, :title, :user_input, :bot_response)"),
+        [{'id': chat.id, 'title': plain_text(chat.title), 'user_input': plain_text(chat.user_input),
+          'bot_response': plain_text(chat.bot_response, markup=True)} for chat in chats])
+
+@event.listens_for(ChatHistory, 'after_insert')
+def index_new_chat(mapper, connection, chat):
+    index_chats(connection, [chat])
+
+@event.listens_for(ChatHistory, 'after_update')
+def reindex_changed_chat(mapper, connection, chat):
+    state = db.inspect(chat)
+    if any(state.attrs[name].history.has_changes() for name in ('title', 'user_input', 'bot_response')):
+        index_chats(connection, [chat])
+
+def highlight(snippet):
+    return str(escape(snippet)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+def match_query(text):
+    # Quote every word so user input can't be read as FTS5 syntax (AND, NEAR, column
+    # filters, stray quotes); the last word also matches as a prefix for search-as-you-type
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def search_history(user_id, text, limit):
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        query = match_query(text)
+        statement = SQLITE_SEARCH
+    elif dialect == 'postgresql':
+        query = text.strip()
+        statement = POSTGRES_SEARCH
+    else:
+        raise RuntimeError(f'Chat search is not supported on {dialect}')
+    if not query:
+        return []
+
+    rows = db.session.execute(statement, {
+        'query': query, 'user_id': user_id, 'limit': limit, 'tokens': Config.SEARCH_SNIPPET_TOKENS,
+        'mark_start': MARK_START, 'mark_end': MARK_END,
+    })
+    return [
+        {
+            'id': row.id,
+            'title': row.title or None,
+            'snippet': highlight(row.snippet),
+            'timestamp': row.timestamp.isoformat(),
+            'score': round(-row.rank, 4),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,110 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+POLLUTANTS = ('co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3')
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class ReadingIndex:
+    # Thread-safe index of recently fetched current readings by location. Points are
+    # bucketed on a lat/lon grid (the same idea as a geohash prefix) whose cells are
+    # `bucket_km` tall, so a radius query only scans the handful of buckets around
+    # the point. Entries are replaced per key, expire after `max_age` seconds and the
+    # oldest are evicted beyond `max_entries`.
+
+    def __init__(self, bucket_km, max_age, max_entries=10000):
+        self.bucket_deg = bucket_km / KM_PER_DEG_LAT
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (latitude, longitude, fetched_at, reading)
+        self._buckets = {}  # (row, col) -> set of keys
+        self._lock = threading.Lock()
+
+    def bucket(self, latitude, longitude):
+        return math.floor(latitude / self.bucket_deg), math.floor(longitude / self.bucket_deg)
+
+    def add(self, key, latitude, longitude, reading):
+        latitude, longitude = float(latitude), float(longitude)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (latitude, longitude, time.time(), reading)
+            self._buckets.setdefault(self.bucket(latitude, longitude), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        bucket = self.bucket(entry[0], entry[1])
+        keys = self._buckets.get(bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._buckets[bucket]
+
+    def nearby(self, latitude, longitude, radius_km, limit=None):
+        # Fresh readings within radius_km, nearest first, as (distance_km, age_seconds, key, reading)
+        latitude, longitude = float(latitude), float(longitude)
+        now = time.time()
+        lat_span = radius_km / KM_PER_DEG_LAT
+        lon_span = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(latitude)), 0.01))
+        row_min, col_min = self.bucket(latitude - lat_span, longitude - lon_span)
+        row_max, col_max = self.bucket(latitude + lat_span, longitude + lon_span)
+
+        found = []
+        with self._lock:
+            for row in range(row_min, row_max + 1):
+                for col in range(col_min, col_max + 1):
+                    for key in list(self._buckets.get((row, col), ())):
+                        entry_lat, entry_lon, fetched_at, reading = self._entries[key]
+                        age = now - fetched_at
+                        if age > self.max_age:
+                            self._remove(key)
+                            continue
+                        distance = haversine_km(latitude, longitude, entry_lat, entry_lon)
+                        if distance <= radius_km:
+                            found.append((distance, age, key, reading))
+        found.sort(key=lambda item: item[0])
+        return found[:limit] if limit else found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def interpolate_reading(neighbours, power=2):
+    # Inverse-distance weighted blend of OpenWeather current readings. A neighbour at
+    # (almost) zero distance is returned as-is. The AQI is an index from 1 to 5, so the
+    # blended value is rounded back onto that scale.
+    nearest = neighbours[0]
+    if nearest[0] < 1e-3:
+        return nearest[3]
+
+    weights = [1 / distance ** power for distance, _, _, _ in neighbours]
+    total = sum(weights)
+    samples = [reading['list'][0] for _, _, _, reading in neighbours]
+    components = {
+        name: round(sum(weight * sample['components'].get(name, 0) for weight, sample in zip(weights, samples)) / total, 2)
+        for name in POLLUTANTS
+    }
+    aqi = sum(weight * sample['main']['aqi'] for weight, sample in zip(weights, samples)) / total
+    return {
+        **nearest[3],
+        'list': [{
+            'dt': max(sample['dt'] for sample in samples),
+            'main': {'aqi': min(max(int(aqi + 0.5), 1), 5)},
+            'components': components,
+        }],
+    }
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The backend modules are imported top-level (`import throttle`), as the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Never touch the development database in instance/
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}"
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # A fresh SQLite database per test, with its schema created by db.create_all()
+    from app import create_app
+    from config import Config
+    from models import db
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        TESTING = True
+
+    monkeypatch.setattr(Config, 'CHAT_ARCHIVE_DIR', str(tmp_path / 'chat_archive'))
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(app):
+    from models import db, User
+
+    def make_user(username):
+        user = User(username=username, email=f'{username}@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
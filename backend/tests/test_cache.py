@@ -0,0 +1,12 @@
+from cache import TTLCache
+
+
+def test_membership_check_leaves_stats_alone():
+    cache = TTLCache(ttl=60)
+    cache.set('fresh', 1)
+    cache.set('expired', 2, ttl=0)
+
+    assert 'fresh' in cache
+    assert 'expired' not in cache
+    assert 'missing' not in cache
+    assert cache.stats()['hits'] == 0 and cache.stats()['misses'] == 0
@@ -0,0 +1,28 @@
+from markupsafe import Markup
+from app import save_chat
+from conversation import build_context, get_or_create_conversation
+from models import db, ChatHistory, Conversation
+
+
+def test_new_conversation_is_inserted_with_its_first_turn(make_user):
+    user = make_user('alice')
+    conversation = get_or_create_conversation(user.id)
+    # nothing is written before Gemini answers
+    assert conversation.id is None
+    assert conversation not in db.session
+    assert build_context(conversation) == []
+
+    chat = save_chat(user.id, 'Is it safe to run outside?', Markup('Yes.'), conversation)
+    db.session.commit()
+    assert conversation.id is not None
+    assert db.session.get(ChatHistory, chat.id).conversation_id == conversation.id
+    assert Conversation.query.count() == 1
+
+def test_existing_conversation_is_only_returned_to_its_owner(make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+    conversation = get_or_create_conversation(alice.id)
+    save_chat(alice.id, 'Hello', Markup('Hi.'), conversation)
+    db.session.commit()
+
+    assert get_or_create_conversation(alice.id, conversation.id) is conversation
+    assert get_or_create_conversation(bob.id, conversation.id) is None
@@ -0,0 +1,30 @@
+from markupsafe import Markup
+from app import save_chat
+from conversation import get_or_create_conversation
+from jobs import JobQueue
+from models import db, BackgroundJob, ChatHistory
+
+
+def test_submit_joins_the_callers_transaction(app):
+    jobs = JobQueue()
+    job_id = jobs.submit('chat_title', {'chat_id': 1})
+    assert jobs._queue.empty()  # not dispatched before the commit
+    db.session.commit()
+    assert jobs._queue.get_nowait() == job_id
+    assert db.session.get(BackgroundJob, job_id) is not None
+
+def test_rolled_back_jobs_are_never_dispatched(app):
+    jobs = JobQueue()
+    jobs.submit('chat_title', {'chat_id': 1})
+    db.session.rollback()
+    db.session.commit()
+    assert jobs._queue.empty()
+    assert BackgroundJob.query.count() == 0
+
+def test_save_chat_commits_the_turn_with_its_title_job(make_user):
+    user = make_user('alice')
+    chat = save_chat(user.id, 'Is it safe outside?', Markup('Yes.'), get_or_create_conversation(user.id))
+    chat_id = chat.id
+    db.session.rollback()  # nothing is left uncommitted
+    assert db.session.get(ChatHistory, chat_id) is not None
+    assert BackgroundJob.query.filter_by(kind='chat_title').count() == 1
@@ -0,0 +1,19 @@
+import json
+import time
+from rankings import ranking_service
+
+
+def test_cold_rankings_answer_503_right_away(app, monkeypatch):
+    monkeypatch.setattr(ranking_service, '_payload', None)
+    started = time.perf_counter()
+    response = app.test_client().get('/api/rankings')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'].isdigit()
+    assert time.perf_counter() - started < 1
+
+def test_rankings_serve_the_latest_payload(app, monkeypatch):
+    payload = json.dumps({'rankings': [{'city': 'Lahore', 'aqi': 180, 'rank': 1}], 'updated_at': 'now'})
+    monkeypatch.setattr(ranking_service, '_payload', payload)
+    response = app.test_client().get('/api/rankings')
+    assert response.status_code == 200
+    assert response.get_json()['rankings'][0]['city'] == 'Lahore'
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import os
+import pytest
+import retention
+from models import db, ChatHistory, Conversation
+from retention import archive_months, purge_expired_history, restore_history
+
+OLD = datetime(2025, 3, 14, 9, 30)
+
+
+def add_chats(user, count, timestamp=None, conversation=None):
+    chats = [ChatHistory(user_id=user.id, user_input=f'question {index}', bot_response=f'<b>answer {index}</b>',
+                         title=f'chat {index}', timestamp=(timestamp or datetime.utcnow()) + timedelta(seconds=index),
+                         conversation_id=conversation.id if conversation else None)
+             for index in range(count)]
+    db.session.add_all(chats)
+    db.session.commit()
+    return chats
+
+def turns(user):
+    return sorted((chat.user_input, chat.timestamp) for chat in ChatHistory.query.filter_by(user_id=user.id))
+
+
+def test_purge_archives_old_turns_only(make_user):
+    alice = make_user('alice')
+    add_chats(alice, 3, OLD)
+    recent = add_chats(alice, 2)
+
+    assert purge_expired_history(days=30, batch_size=2) == 3
+    assert [chat.id for chat in ChatHistory.query.order_by(ChatHistory.id)] == [chat.id for chat in recent]
+    assert archive_months(alice.id) == ['2025-03']
+
+def test_purge_removes_conversations_left_empty(make_user):
+    alice = make_user('alice')
+    conversation = Conversation(user_id=alice.id, updated_at=OLD)
+    db.session.add(conversation)
+    db.session.commit()
+    add_chats(alice, 2, OLD, conversation)
+
+    purge_expired_history(days=30)
+    assert Conversation.query.count() == 0
+
+def test_restore_brings_turns_back_and_removes_the_archive(make_user):
+    alice = make_user('alice')
+    add_chats(alice, 3, OLD)
+    before = turns(alice)
+    purge_expired_history(days=30)
+
+    assert restore_history(alice.id) == 3
+    assert turns(alice) == before
+    assert archive_months(alice.id) == []
+    assert all(chat.restored_at is not None for chat in ChatHistory.query)
+
+def test_restored_turns_survive_the_next_purge(make_user):
+    alice = make_user('alice')
+    add_chats(alice, 2, OLD)
+    purge_expired_history(days=30)
+    restore_history(alice.id, '2025-03')
+
+    assert purge_expired_history(days=30) == 0
+    assert len(turns(alice)) == 2
+
+def test_restore_renumbers_turns_whose_id_was_reused(make_user):
+    alice, bob = make_user('alice'), make_user('bob')
+    reused_id = add_chats(alice, 3, OLD)[0].id
+    before = turns(alice)
+    purge_expired_history(days=30)
+    # SQLite hands the freed ids out again
+    bob_chat = ChatHistory(id=reused_id, user_id=bob.id, user_input='bob', bot_response='hi')
+    db.session.add(bob_chat)
+    db.session.commit()
+
+    assert restore_history(alice.id) == 3
+    assert turns(alice) == before
+    assert db.session.get(ChatHistory, bob_chat.id).user_id == bob.id
+    assert archive_months(alice.id) == []
+
+def test_retried_restore_does_not_duplicate_turns(make_user, monkeypatch):
+    alice, bob = make_user('alice'), make_user('bob')
+    reused_id = add_chats(alice, 3, OLD)[0].id
+    before = turns(alice)
+    purge_expired_history(days=30)
+    db.session.add(ChatHistory(id=reused_id, user_id=bob.id, user_input='bob', bot_response='hi'))
+    db.session.commit()
+
+    # the rows are committed, then the worker fails before the archive is removed
+    def fail(path):
+        raise OSError('disk went away')
+    with monkeypatch.context() as patched:
+        patched.setattr(retention.os, 'remove', fail)
+        with pytest.raises(OSError):
+            restore_history(alice.id)
+    assert archive_months(alice.id) == ['2025-03']
+
+    assert restore_history(alice.id) == 0
+    assert turns(alice) == before
+    assert archive_months(alice.id) == []
+
+def test_duplicate_archive_entries_are_restored_once(make_user):
+    alice = make_user('alice')
+    chats = add_chats(alice, 2, OLD)
+    # two overlapping retention runs appended the same turns twice
+    records = [retention.chat_record(chat) for chat in chats]
+    retention.append_archive(retention.archive_path(alice.id, '2025-03'), records)
+    purge_expired_history(days=30)
+
+    assert restore_history(alice.id) == 2
+    assert len(turns(alice)) == 2
+    assert not os.path.exists(retention.archive_path(alice.id, '2025-03'))
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+import pytest
+from throttle import (AsyncSingleFlight, BudgetExhausted, CircuitBreaker, CircuitOpen, SingleFlight,
+                      TokenBucket)
+
+
+def open_breaker(threshold=2, reset_timeout=30):
+    breaker = CircuitBreaker('test', threshold, reset_timeout)
+    for _ in range(threshold):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+def expire(breaker):
+    breaker.opened_at -= breaker.reset_timeout + 1
+
+
+# === CircuitBreaker ===
+
+def test_breaker_stays_closed_below_threshold():
+    breaker = CircuitBreaker('test', 3, 30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    assert breaker.state == 'closed'
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker('test', 2, 30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+def test_breaker_opens_and_fails_fast():
+    breaker = open_breaker()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.status == 503
+    assert 0 < excinfo.value.retry_after <= 30
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+def test_successful_trial_closes():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    breaker.before_call()
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+def test_abandoned_trial_frees_the_slot():
+    breaker = open_breaker()
+    expire(breaker)
+    breaker.before_call()
+    breaker.abandon()
+    breaker.before_call()
+    assert breaker.state == 'half_open'
+
+
+# === TokenBucket ===
+
+def test_zero_rate_disables_the_budget():
+    bucket = TokenBucket('test', 0, 1, max_wait=0)
+    assert all(bucket.reserve() == 0 for _ in range(100))
+
+def test_burst_is_free_then_callers_queue():
+    bucket = TokenBucket('test', 60, 3, max_wait=10)  # one token per second
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits == sorted(waits)
+    assert waits[0] == pytest.approx(1, abs=0.05)
+    assert waits[2] == pytest.approx(3, abs=0.05)
+
+def test_wait_beyond_max_wait_is_refused():
+    bucket = TokenBucket('test', 60, 1, max_wait=1.5)
+    bucket.reserve()
+    bucket.reserve()  # due in ~1 s
+    with pytest.raises(BudgetExhausted) as excinfo:
+        bucket.reserve()  # due in ~2 s
+    assert excinfo.value.status == 429
+    assert excinfo.value.retry_after == pytest.approx(2, abs=0.05)
+
+def test_tokens_refill_over_time():
+    bucket = TokenBucket('test', 6000, 1, max_wait=0)  # 100 tokens per second
+    bucket.reserve()
+    time.sleep(0.05)
+    assert bucket.reserve() == 0
+
+
+# === SingleFlight ===
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test')
+    calls = []
+    release = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow, 21))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [21]
+    assert results == [42] * 5
+
+def test_exception_reaches_every_waiter_and_the_key_is_freed():
+    flight = SingleFlight('test')
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert flight.do('key', lambda: 'fresh') == 'fresh'
+
+
+# === AsyncSingleFlight ===
+
+def test_async_calls_share_one_execution():
+    flight = AsyncSingleFlight('test')
+    calls = []
+
+    async def slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.do('key', slow, 21) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight('test')
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('key', slow))
+        second = asyncio.ensure_future(flight.do('key', slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'done'
@@ -0,0 +1,15 @@
+import time
+from models import db, AqiReading
+from timeseries import prune_readings
+
+
+def test_prune_deletes_only_readings_past_the_window(app):
+    now = int(time.time())
+    days = 86400
+    for index, age in enumerate([120 * days, 91 * days, 89 * days, 3600]):
+        db.session.add(AqiReading(cell_lat=315, cell_lon=743 + index, dt=now - age, aqi=3))
+    db.session.commit()
+
+    assert prune_readings(days=90, batch_size=1) == 2
+    assert sorted(now - row.dt for row in AqiReading.query) == [3600, 89 * days]
+    assert prune_readings(days=90) == 0
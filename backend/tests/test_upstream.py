@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+import requests
+from throttle import CircuitBreaker, CircuitOpen
+from upstream import AsyncUpstreamClient, UpstreamClient
+
+URL = 'http://upstream.test/data'
+
+
+class FailingSession:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+
+    def get(self, url, **kwargs):
+        raise self.errors.pop(0)
+
+
+def half_open_client(client_class):
+    breaker = CircuitBreaker('upstream.test', 1, 30)
+    breaker.record_failure()
+    breaker.opened_at -= 31
+    return client_class(retries=0, host_breakers={'upstream.test': breaker}), breaker
+
+def test_unexpected_error_on_trial_reopens_the_breaker():
+    client, breaker = half_open_client(UpstreamClient)
+    client.session = FailingSession(requests.exceptions.ChunkedEncodingError('broken body'))
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.get(URL)
+    assert breaker.state == 'open'
+    breaker.opened_at -= 31
+    breaker.before_call()  # the next trial is allowed, not refused forever
+
+def test_async_unexpected_error_on_trial_reopens_the_breaker():
+    httpx = pytest.importorskip('httpx')
+    client, breaker = half_open_client(AsyncUpstreamClient)
+
+    class FailingClient:
+        async def get(self, url, **kwargs):
+            raise httpx.RemoteProtocolError('peer closed connection')
+
+    client._client = FailingClient()
+    with pytest.raises(httpx.RemoteProtocolError):
+        asyncio.run(client.get(URL))
+    assert breaker.state == 'open'
+
+def test_async_cancelled_trial_frees_the_slot():
+    pytest.importorskip('httpx')
+    client, breaker = half_open_client(AsyncUpstreamClient)
+
+    class HangingClient:
+        async def get(self, url, **kwargs):
+            await asyncio.sleep(10)
+
+    client._client = HangingClient()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get(URL), 0.05)
+
+    asyncio.run(main())
+    assert breaker.state == 'half_open'
+    breaker.before_call()
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
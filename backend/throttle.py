@@ -0,0 +1,192 @@
+import asyncio
+from concurrent.futures import Future
+import math
+import threading
+import time
+from metrics import (circuit_rejections, circuit_state, upstream_budget_rejections, upstream_budget_wait_seconds,
+                     upstream_coalesced)
+
+
+class UpstreamUnavailable(Exception):
+    # The third-party API can't be used right now; `retry_after` is a hint in seconds.
+    # 503: the provider itself throttled us (it kept answering 429).
+    status = 503
+
+    def __init__(self, upstream, retry_after, message=None):
+        super().__init__(message or f"{upstream} is unavailable, retry in {math.ceil(retry_after)} s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class BudgetExhausted(UpstreamUnavailable):
+    # 429: our own per-upstream budget has no token for this call within the queue wait
+    status = 429
+
+    def __init__(self, upstream, retry_after):
+        super().__init__(upstream, retry_after,
+                         f"Too many {upstream} requests right now, retry in {math.ceil(retry_after)} s")
+
+
+class CircuitOpen(UpstreamUnavailable):
+    # 503: the upstream has been failing, so calls are refused without trying it
+    def __init__(self, upstream, retry_after):
+        super().__init__(upstream, retry_after,
+                         f"{upstream} is failing, requests are paused for {math.ceil(retry_after)} s")
+
+
+class CircuitBreaker:
+    # Stops calling an upstream that keeps failing. After `failure_threshold` consecutive
+    # failures the circuit opens and calls fail fast with CircuitOpen for `reset_timeout`
+    # seconds. Then a single trial call goes through (half-open): success closes the
+    # circuit, failure opens it again. Callers report each attempt with record_success()
+    # or record_failure(), or abandon() when they gave up before reaching the upstream.
+    STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        circuit_state.set(0, upstream=name)
+
+    def _set_state(self, state):
+        self.state = state
+        circuit_state.set(self.STATES[state], upstream=self.name)
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open':
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining <= 0:
+                    self._set_state('half_open')
+                    self._trial_running = True
+                    return
+            else:  # half-open: only the trial call goes through
+                if not self._trial_running:
+                    self._trial_running = True
+                    return
+                remaining = self.reset_timeout
+        circuit_rejections.inc(upstream=self.name)
+        raise CircuitOpen(self.name, max(remaining, 1))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != 'closed':
+                self._set_state('closed')
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != 'open':
+                    self._set_state('open')
+
+    def abandon(self):
+        with self._lock:
+            self._trial_running = False
+
+
+class TokenBucket:
+    # Rate budget for one upstream: `rate_per_minute` tokens refill continuously, up to
+    # `burst`. A caller that finds the bucket empty reserves the next token and sleeps
+    # until it is due, so waiting callers are served in arrival order. If that wait would
+    # exceed `max_wait` the call is refused instead, which bounds the queue to roughly
+    # rate * max_wait callers. A rate of 0 disables the budget.
+
+    def __init__(self, name, rate_per_minute, burst, max_wait):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_wait = max_wait
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Seconds the caller must wait for its token; raises BudgetExhausted when too long
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > self.max_wait:
+                upstream_budget_rejections.inc(upstream=self.name)
+                raise BudgetExhausted(self.name, wait)
+            self._tokens -= 1  # may go negative: tokens owed to callers already waiting
+        upstream_budget_wait_seconds.observe(wait, upstream=self.name)
+        return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution: the first caller runs
+    # `func`, the others wait for its result (or exception) instead of repeating it.
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> Future of the running call
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            upstream_coalesced.inc(upstream=self.name)
+            return future.result()
+
+        try:
+            result = func(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    # Event-loop counterpart of SingleFlight. The shared task is shielded, so one waiter
+    # timing out or disconnecting doesn't cancel the call for the others.
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> Task of the running call
+
+    async def do(self, key, func, *args):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args))
+
+            def forget(done):
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+            task.add_done_callback(forget)
+        else:
+            upstream_coalesced.inc(upstream=self.name)
+        return await asyncio.shield(task)
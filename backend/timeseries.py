@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta, timezone
+import threading
+from sqlalchemy import func
+from models import db, AqiReading
+from jobs import job_queue
+from config import Config
+
+POLLUTANTS = ('co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3')
+RESOLUTIONS = {'hourly': 3600, 'daily': 86400}
+
+def reading_rows(cell, payload):
+    return [
+        dict(
+            cell_lat=cell[0],
+            cell_lon=cell[1],
+            dt=item['dt'],
+            aqi=item['main']['aqi'],
+            **{name: item['components'].get(name) for name in POLLUTANTS}
+        )
+        for item in payload.get('list', [])
+    ]
+
+def insert_readings(rows):
+    # Bulk insert in one statement; readings already stored for a cell/timestamp are skipped
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        statement = insert(AqiReading).on_conflict_do_nothing(index_elements=['cell_lat', 'cell_lon', 'dt'])
+    else:
+        statement = db.insert(AqiReading)
+    db.session.execute(statement, rows)
+    db.session.commit()
+
+
+class ReadingRecorder:
+    # Buffers readings in memory and writes them in batches from a background thread,
+    # so recording never adds a database write to the request path. Nothing is recorded
+    # until start(), and if the writer falls behind the oldest rows beyond `max_buffered`
+    # are dropped.
+
+    def __init__(self, batch_size=200, flush_interval=5, max_buffered=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered or batch_size * 10
+        self.app = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='reading-recorder', daemon=True)
+            self._thread.start()
+
+    def record(self, cell, payload):
+        if self._thread is None:  # no writer (e.g. create_app(start_background=False))
+            return
+        rows = reading_rows(cell, payload)
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) > self.max_buffered:
+                del self._buffer[:len(self._buffer) - self.max_buffered]
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        # keep one row per cell/timestamp within the batch
+        rows = list({(row['cell_lat'], row['cell_lon'], row['dt']): row for row in rows}.values())
+        with self.app.app_context():
+            try:
+                insert_readings(rows)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Failed to store {len(rows)} AQI readings: {e!r}")
+                return 0
+        return len(rows)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def reading_trend(cell, since, resolution='hourly'):
+    # Downsampled history for one grid cell: per-bucket averages and AQI extremes
+    seconds = RESOLUTIONS[resolution]
+    bucket = (AqiReading.dt // seconds * seconds).label('bucket')
+    rows = (db.session.query(
+                bucket,
+                func.count(AqiReading.id),
+                func.avg(AqiReading.aqi),
+                func.max(AqiReading.aqi),
+                func.min(AqiReading.aqi),
+                *[func.avg(getattr(AqiReading, name)) for name in POLLUTANTS])
+            .filter(AqiReading.cell_lat == cell[0],
+                    AqiReading.cell_lon == cell[1],
+                    AqiReading.dt >= int(since.timestamp()))
+            .group_by(bucket)
+            .order_by(bucket)
+            .all())
+
+    series = []
+    for row in rows:
+        entry = {
+            'time': datetime.fromtimestamp(row[0], tz=timezone.utc).isoformat(),
+            'samples': row[1],
+            'aqi': round(row[2], 2),
+            'aqi_max': row[3],
+            'aqi_min': row[4],
+        }
+        for name, value in zip(POLLUTANTS, row[5:]):
+            entry[name] = round(value, 2) if value is not None else None
+        series.append(entry)
+    return series
+
+
+def prune_readings(days=None, batch_size=None):
+    # Delete readings older than the longest window the history API serves, one batch per
+    # transaction. Readings arrive roughly in time order, so walking the primary key finds
+    # the oldest first without needing an index on dt.
+    days = Config.READINGS_MAX_DAYS if days is None else days
+    batch_size = batch_size or Config.READINGS_PRUNE_BATCH
+    cutoff = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp())
+
+    total = 0
+    last_id = 0
+    while True:
+        ids = [row.id for row in (db.session.query(AqiReading.id)
+                                  .filter(AqiReading.dt < cutoff, AqiReading.id > last_id)
+                                  .order_by(AqiReading.id)
+                                  .limit(batch_size))]
+        if not ids:
+            break
+        AqiReading.query.filter(AqiReading.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        total += len(ids)
+        last_id = ids[-1]
+    return total
+
+@job_queue.register('readings_prune')
+def run_readings_prune(payload):
+    pruned = prune_readings(payload.get('days'))
+    if pruned:
+        print(f"Pruned {pruned} AQI readings older than {payload.get('days') or Config.READINGS_MAX_DAYS} days")
+
+
+reading_recorder = ReadingRecorder(Config.READINGS_BATCH_SIZE, Config.READINGS_FLUSH_INTERVAL)
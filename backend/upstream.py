@@ -0,0 +1,202 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import upstream_request_seconds
+from throttle import BudgetExhausted, CircuitBreaker, TokenBucket, UpstreamUnavailable
+from config import Config
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class UpstreamClient:
+    # Shared HTTP client for the third-party APIs: one pooled keep-alive session,
+    # per-host timeouts, call budgets and circuit breakers, and retries with jittered
+    # exponential backoff. Every attempt, retries included, spends a token of the host's
+    # budget and counts towards its breaker.
+
+    def __init__(self, pool_size=20, retries=2, backoff=0.25, max_backoff=4.0,
+                 connect_timeout=3.05, read_timeout=10, host_timeouts=None, host_budgets=None,
+                 host_breakers=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.host_timeouts = host_timeouts or {}
+        self.host_budgets = host_budgets or {}
+        self.host_breakers = host_breakers or {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def timeout_for(self, url):
+        read_timeout = self.host_timeouts.get(urlsplit(url).hostname, self.read_timeout)
+        return (self.connect_timeout, read_timeout)
+
+    def backoff_delay(self, attempt):
+        # "Full jitter": spreads retries from concurrent callers instead of synchronising them
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def throttled(self, host, response):
+        # The provider is still answering 429 after our retries
+        try:
+            retry_after = float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            retry_after = self.max_backoff
+        budget = self.host_budgets.get(host)
+        return UpstreamUnavailable(budget.name if budget else host, retry_after)
+
+    def admit(self, host):
+        # Fail fast while the host's circuit is open, then wait for a budget token
+        breaker = self.host_breakers.get(host)
+        if breaker is not None:
+            breaker.before_call()
+        budget = self.host_budgets.get(host)
+        if budget is not None:
+            try:
+                budget.acquire()
+            except BudgetExhausted:
+                self.release(host)
+                raise
+
+    def release(self, host):
+        # The attempt ended without an outcome for the host (e.g. it was cancelled)
+        breaker = self.host_breakers.get(host)
+        if breaker is not None:
+            breaker.abandon()
+
+    def record(self, host, status):
+        breaker = self.host_breakers.get(host)
+        if breaker is None:
+            return
+        if status == 'error' or status in RETRY_STATUSES:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout_for(url))
+        host = urlsplit(url).hostname
+        for attempt in range(self.retries + 1):
+            self.admit(host)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status='error')
+                self.record(host, 'error')
+                if attempt == self.retries:
+                    raise
+            except Exception:  # any other failure still ends the attempt, e.g. a broken chunked body
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status='error')
+                self.record(host, 'error')
+                raise
+            else:
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status=response.status_code)
+                self.record(host, response.status_code)
+                if response.status_code == 429 and attempt == self.retries:
+                    response.close()
+                    raise self.throttled(host, response)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+                response.close()  # hand the connection back to the pool before sleeping
+            time.sleep(self.backoff_delay(attempt))
+
+
+class AsyncUpstreamClient(UpstreamClient):
+    # Non-blocking counterpart for the ASGI entry point, with the same pool size,
+    # retry and timeout policy. httpx is only needed when this client is used.
+
+    def __init__(self, pool_size=20, **kwargs):
+        super().__init__(pool_size=pool_size, **kwargs)
+        self.pool_size = pool_size
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=self.pool_size * 4,
+                max_keepalive_connections=self.pool_size,
+            ))
+        return self._client
+
+    async def admit_async(self, host):
+        breaker = self.host_breakers.get(host)
+        if breaker is not None:
+            breaker.before_call()
+        budget = self.host_budgets.get(host)
+        if budget is not None:
+            try:
+                await budget.acquire_async()
+            except BudgetExhausted:
+                self.release(host)
+                raise
+
+    async def get(self, url, **kwargs):
+        import httpx
+
+        connect_timeout, read_timeout = self.timeout_for(url)
+        kwargs.setdefault('timeout', httpx.Timeout(read_timeout, connect=connect_timeout))
+        host = urlsplit(url).hostname
+        for attempt in range(self.retries + 1):
+            await self.admit_async(host)
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url, **kwargs)
+            except (httpx.ConnectError, httpx.TimeoutException):
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status='error')
+                self.record(host, 'error')
+                if attempt == self.retries:
+                    raise
+            except Exception:
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status='error')
+                self.record(host, 'error')
+                raise
+            except asyncio.CancelledError:  # the caller went away; the attempt says nothing about the host
+                self.release(host)
+                raise
+            else:
+                upstream_request_seconds.observe(time.perf_counter() - start, host=host, status=response.status_code)
+                self.record(host, response.status_code)
+                if response.status_code == 429 and attempt == self.retries:
+                    raise self.throttled(host, response)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            await asyncio.sleep(self.backoff_delay(attempt))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared by the sync and async clients, so both draw from the same plan limit and
+# see the same upstream health
+openweather_budget = TokenBucket('openweather', Config.OPENWEATHER_RATE_PER_MIN, Config.OPENWEATHER_BURST,
+                                 Config.UPSTREAM_BUDGET_MAX_WAIT)
+openweather_breaker = CircuitBreaker('openweather', Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_TIMEOUT)
+
+UPSTREAM_SETTINGS = dict(
+    pool_size=Config.UPSTREAM_POOL_SIZE,
+    retries=Config.UPSTREAM_RETRIES,
+    backoff=Config.UPSTREAM_BACKOFF,
+    connect_timeout=Config.UPSTREAM_CONNECT_TIMEOUT,
+    host_timeouts={
+        urlsplit(Config.OPENWEATHER_BASE_URL).hostname: Config.OPENWEATHER_TIMEOUT,
+        'api.api-ninjas.com': Config.API_NINJAS_TIMEOUT,
+    },
+    host_budgets={
+        urlsplit(Config.OPENWEATHER_BASE_URL).hostname: openweather_budget,
+    },
+    host_breakers={
+        urlsplit(Config.OPENWEATHER_BASE_URL).hostname: openweather_breaker,
+    },
+)
+upstream = UpstreamClient(**UPSTREAM_SETTINGS)
+async_upstream = AsyncUpstreamClient(**UPSTREAM_SETTINGS)
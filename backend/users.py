@@ -0,0 +1,49 @@
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from cache import TTLCache
+from metrics import watch_cache
+from models import db, User
+from config import Config
+
+USER_FIELDS = ('id', 'username', 'email', 'password')
+
+# Column values of recently authenticated users, keyed by id. Plain values are cached
+# rather than User instances, which belong to the session of the request that loaded them.
+user_cache = TTLCache(Config.USER_CACHE_TTL, Config.USER_CACHE_MAX_ENTRIES)
+watch_cache('users', user_cache)
+
+def load_user(user_id):
+    user_id = int(user_id)
+    fields = user_cache.get(user_id)
+    if fields is None:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, {name: getattr(user, name) for name in USER_FIELDS})
+        return user
+
+    # Attach the cached row to this request's session without a SELECT; changes made
+    # through current_user (e.g. a new password) are still flushed on commit
+    user = User(**fields)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+def invalidate_user(user_id):
+    user_cache.delete(int(user_id))
+
+# Any write to an account (api_change_password, profile edits, deletion) drops its entry
+# once the transaction commits. Dropping it at flush time would let a concurrent request
+# re-cache the old row before the commit. Other worker processes pick the change up once
+# their entry expires.
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def track_changed_user(mapper, connection, user):
+    object_session(user).info.setdefault('changed_users', set()).add(user.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_users', ()):
+        invalidate_user(user_id)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def forget_changed_users(session, previous_transaction):
+    session.info.pop('changed_users', None)
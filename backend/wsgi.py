@@ -0,0 +1,4 @@
+# WSGI entry point for production servers: `gunicorn wsgi:app --workers 4` (run from backend/)
+from app import create_app
+
+app = create_app(start_background=True)